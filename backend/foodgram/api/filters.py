@@ -1,23 +1,54 @@
 import django_filters
+from django.db.models import Exists, OuterRef
 from rest_framework.filters import SearchFilter
 
-from recipes.models import Recipe, Tag
+from recipes.models import Recipe, TagRecipe
+from recipes.tags import get_tag_choices, tag_registry
+
+NEWEST = 'newest'
+POPULAR = 'popular'
+TRENDING = 'trending'
+RECIPE_ORDERINGS = {
+    NEWEST: ('-pub_date', '-id'),
+    POPULAR: ('-favorites_count', '-id'),
+    TRENDING: ('-trending_score', '-id'),
+}
+ORDERING_CHOICES = (
+    (NEWEST, 'Сначала новые'),
+    (POPULAR, 'Чаще добавляют в избранное'),
+    (TRENDING, 'Популярные за последние дни'),
+)
 
 
 class SearchIngredient(SearchFilter):
     search_param = 'name'
 
 
+class TagsFilter(django_filters.MultipleChoiceFilter):
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault('choices', get_tag_choices)
+        super().__init__(*args, **kwargs)
+
+    def filter(self, qs, value):
+        if not value:
+            return qs
+        return qs.filter(Exists(TagRecipe.objects.filter(
+            recipe=OuterRef('pk'),
+            tags_id__in=tag_registry.ids_for_slugs(value)
+        )))
+
+
 class RecipeFilter(django_filters.FilterSet):
-    tags = django_filters.filters.ModelMultipleChoiceFilter(
-        field_name='tags__slug',
-        to_field_name='slug',
-        queryset=Tag.objects.all()
-    )
+    tags = TagsFilter()
     author = django_filters.filters.NumberFilter(
         field_name='author__id'
     )
+    ordering = django_filters.ChoiceFilter(choices=ORDERING_CHOICES,
+                                           method='filter_ordering')
 
     class Meta:
         model = Recipe
-        fields = ('tags', 'author')
+        fields = ('tags', 'author', 'ordering')
+
+    def filter_ordering(self, queryset, name, value):
+        return queryset.order_by(*RECIPE_ORDERINGS[value])
@@ -0,0 +1,67 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db.models import Q
+from django.utils import timezone
+
+from recipes.models import DONE, FAILED, PENDING, PROCESSING, ShoppingListJob
+from recipes.services import get_shopping_list
+
+from .renderers import SHOPPING_LIST_RENDERERS_BY_FORMAT
+
+
+def stale_jobs():
+    cutoff = timezone.now() - timedelta(
+        seconds=settings.SHOPPING_LIST_JOB_TIMEOUT
+    )
+    return Q(status=PROCESSING) & (Q(claimed_at__isnull=True)
+                                   | Q(claimed_at__lt=cutoff))
+
+
+def delete_jobs(jobs):
+    for job in jobs.exclude(file=''):
+        job.file.delete(save=False)
+    return jobs.delete()[0]
+
+
+def delete_expired_jobs():
+    cutoff = timezone.now() - timedelta(
+        seconds=settings.SHOPPING_LIST_JOB_RETENTION
+    )
+    return delete_jobs(ShoppingListJob.objects.filter(
+        status__in=(DONE, FAILED), created__lt=cutoff
+    ))
+
+
+def claim_pending_jobs(limit):
+    claimable = Q(status=PENDING) | stale_jobs()
+    job_ids = ShoppingListJob.objects.filter(
+        claimable
+    ).values_list('id', flat=True)[:limit]
+    return [
+        job_id for job_id in job_ids
+        if ShoppingListJob.objects.filter(claimable, id=job_id).update(
+            status=PROCESSING, claimed_at=timezone.now()
+        )
+    ]
+
+
+def process_shopping_list_job(job_id):
+    job = ShoppingListJob.objects.select_related('user').get(id=job_id)
+    renderer = SHOPPING_LIST_RENDERERS_BY_FORMAT[job.format]()
+    try:
+        content = renderer.render(get_shopping_list(job.user))
+        job.file.save(f'{job.id}.{job.format}', ContentFile(content),
+                      save=False)
+        job.status = DONE
+        job.save(update_fields=('status', 'file'))
+        delete_jobs(ShoppingListJob.objects.filter(
+            user_id=job.user_id, format=job.format,
+            cart_version=job.cart_version, created__lt=job.created
+        ).exclude(status__in=(PENDING, PROCESSING)))
+    except Exception as error:
+        job.status = FAILED
+        job.error = str(error)
+        job.save(update_fields=('status', 'error'))
+    return job.status
@@ -0,0 +1,52 @@
+import statistics
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand
+
+from api.renderers import SHOPPING_LIST_RENDERERS_BY_FORMAT
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает время и память генерации списка покупок '
+            'для всех форматов.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--items', type=int, default=200)
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument(
+            '--format',
+            action='append',
+            dest='formats',
+            choices=sorted(SHOPPING_LIST_RENDERERS_BY_FORMAT),
+        )
+
+    def handle(self, *args, **options):
+        ingredients = [
+            {'name': f'ингредиент {number}',
+             'measurement_unit': 'г',
+             'total_amount': number * 10}
+            for number in range(options['items'])
+        ]
+        formats = options['formats'] or SHOPPING_LIST_RENDERERS_BY_FORMAT
+        self.stdout.write(
+            f'{"format":<8}{"median, ms":>12}{"max, ms":>12}'
+            f'{"peak, KiB":>12}{"size, KiB":>12}'
+        )
+        for file_format in formats:
+            renderer = SHOPPING_LIST_RENDERERS_BY_FORMAT[file_format]()
+            renderer.render(ingredients)
+            timings = []
+            for _ in range(options['repeat']):
+                started = time.perf_counter()
+                content = renderer.render(ingredients)
+                timings.append((time.perf_counter() - started) * 1000)
+            tracemalloc.start()
+            renderer.render(ingredients)
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            self.stdout.write(
+                f'{file_format:<8}{statistics.median(timings):>12.2f}'
+                f'{max(timings):>12.2f}{peak / 1024:>12.1f}'
+                f'{len(content) / 1024:>12.1f}'
+            )
@@ -0,0 +1,46 @@
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from api.jobs import (claim_pending_jobs, delete_expired_jobs,
+                      process_shopping_list_job)
+
+
+class Command(BaseCommand):
+    help = 'Генерирует файлы списков покупок из очереди заданий.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=2)
+        parser.add_argument('--poll-interval', type=float, default=1.0)
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Обработать очередь и завершиться.'
+        )
+
+    def handle(self, *args, **options):
+        workers = options['workers']
+        context = multiprocessing.get_context('fork')
+        with ProcessPoolExecutor(max_workers=workers,
+                                 mp_context=context) as pool:
+            while True:
+                job_ids = claim_pending_jobs(limit=workers)
+                if not job_ids:
+                    delete_expired_jobs()
+                    if options['once']:
+                        return
+                    time.sleep(options['poll_interval'])
+                    continue
+                connections.close_all()
+                futures = [pool.submit(process_shopping_list_job, job_id)
+                           for job_id in job_ids]
+                for job_id, future in zip(job_ids, futures):
+                    try:
+                        status = future.result()
+                    except Exception as error:
+                        self.stderr.write(f'{job_id}: {error}')
+                    else:
+                        self.stdout.write(f'{job_id}: {status}')
@@ -0,0 +1,141 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, urlencode
+from rest_framework.response import Response
+
+from recipes.services import get_generations, viewer_generation
+
+RESPONSE_CACHE_KEY = 'response:{path}?{query}:{generations}'
+PAGINATION_QUERY_PARAMS = ('page_query_param', 'page_size_query_param',
+                           'mode_query_param', 'cursor_query_param')
+
+
+def get_normalized_query(request, params):
+    return urlencode(sorted(
+        (key, value)
+        for key, values in request.query_params.lists()
+        if key in params
+        for value in sorted(values)
+        if value
+    ))
+
+
+class QueryParamsMixin:
+    cache_query_params = ()
+
+    def get_cache_query_params(self):
+        params = set(self.cache_query_params)
+        filterset_class = getattr(self, 'filterset_class', None)
+        if filterset_class is not None:
+            params.update(filterset_class.base_filters)
+        for backend in self.filter_backends:
+            search_param = getattr(backend, 'search_param', None)
+            if search_param:
+                params.add(search_param)
+        for name in PAGINATION_QUERY_PARAMS:
+            param = getattr(self.pagination_class, name, None)
+            if param:
+                params.add(param)
+        return params
+
+
+class ConditionalGetMixin(QueryParamsMixin):
+    etag_generations = ()
+    object_etag_generations = None
+    etag_per_viewer = False
+
+    def list(self, request, *args, **kwargs):
+        etag = self.get_etag(request, self.get_etag_generations())
+        return self.get_conditional(super().list, request, etag, None,
+                                    *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        lookup = kwargs[self.lookup_url_kwarg or self.lookup_field]
+        validators = self.get_object_validators(lookup)
+        if validators is None:
+            return super().retrieve(request, *args, **kwargs)
+        parts, last_modified = validators
+        generations = self.object_etag_generations
+        if generations is None:
+            generations = self.etag_generations
+        etag = self.get_etag(request, generations, *parts)
+        if request.user.is_authenticated and self.etag_per_viewer:
+            last_modified = None
+        return self.get_conditional(super().retrieve, request, etag,
+                                    last_modified, *args, **kwargs)
+
+    def get_etag_generations(self):
+        return tuple(self.etag_generations)
+
+    def get_object_validators(self, lookup):
+        return (lookup,), None
+
+    def get_etag(self, request, generations, *parts):
+        names = list(generations)
+        if self.etag_per_viewer and request.user.is_authenticated:
+            names.append(viewer_generation(request.user.id))
+        value = ':'.join([
+            request.path,
+            get_normalized_query(request, self.get_cache_query_params()),
+            request.accepted_renderer.format,
+            *get_generations(names),
+            *map(str, parts),
+        ])
+        return '"{}"'.format(hashlib.md5(value.encode()).hexdigest())
+
+    def get_conditional(self, handler, request, etag, last_modified,
+                        *args, **kwargs):
+        timestamp = last_modified and int(last_modified.timestamp())
+        response = get_conditional_response(
+            request, etag=etag, last_modified=timestamp
+        )
+        if response is None:
+            response = handler(request, *args, **kwargs)
+        if response.status_code in (200, 304):
+            response['ETag'] = etag
+            if timestamp:
+                response['Last-Modified'] = http_date(timestamp)
+            if self.etag_per_viewer and request.user.is_authenticated:
+                patch_cache_control(response, private=True)
+        return response
+
+
+class AnonymousResponseCacheMixin(QueryParamsMixin):
+    cache_generations = ()
+
+    def list(self, request, *args, **kwargs):
+        return self.get_cached_response(super().list, request,
+                                        *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.get_cached_response(super().retrieve, request,
+                                        *args, **kwargs)
+
+    def get_cache_generations(self):
+        return tuple(self.cache_generations)
+
+    def get_response_cache_key(self, request):
+        return RESPONSE_CACHE_KEY.format(
+            path=request.path,
+            query=get_normalized_query(request,
+                                       self.get_cache_query_params()),
+            generations='.'.join(get_generations(
+                self.get_cache_generations()
+            ))
+        )
+
+    def get_cached_response(self, handler, request, *args, **kwargs):
+        if request.user.is_authenticated:
+            return handler(request, *args, **kwargs)
+        cache = caches[settings.RESPONSE_CACHE_ALIAS]
+        key = self.get_response_cache_key(request)
+        data = cache.get(key)
+        if data is not None:
+            return Response(data)
+        response = handler(request, *args, **kwargs)
+        if response.status_code == 200:
+            cache.set(key, response.data, settings.RESPONSE_CACHE_TIMEOUT)
+        return response
@@ -1,6 +1,180 @@
-from rest_framework.pagination import PageNumberPagination
+import base64
+import hashlib
+import json
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet, ValidationError
+from django.core.paginator import Paginator
+from django.db.models import Q, QuerySet
+from django.utils.functional import cached_property
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+CURSOR_MODE = 'cursor'
+COUNT_CACHE_KEY = 'pagination_count:{}'
+
+
+class CachedCountPaginator(Paginator):
+    @cached_property
+    def count(self):
+        timeout = settings.PAGINATION_COUNT_CACHE_TIMEOUT
+        if not timeout or not isinstance(self.object_list, QuerySet):
+            return super().count
+        try:
+            sql = str(self.object_list.query)
+        except EmptyResultSet:
+            return 0
+        key = COUNT_CACHE_KEY.format(hashlib.md5(sql.encode()).hexdigest())
+        count = cache.get(key)
+        if count is None:
+            count = self.object_list.count()
+            cache.set(key, count, timeout)
+        return count
+
+
+class KeysetPagination(BasePagination):
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'limit'
+    page_size = 6
+    max_page_size = 100
+    ordering = ('-pub_date', '-id')
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.ordering = getattr(view, 'keyset_ordering', self.ordering)
+        self.fields = [(name.lstrip('-'), name.startswith('-'))
+                       for name in self.ordering]
+        self.model = queryset.model
+        page_size = self.get_page_size(request)
+        position, reverse = self.decode_cursor(request)
+        fields = self.fields
+        if reverse:
+            fields = [(name, not desc) for name, desc in fields]
+        queryset = queryset.order_by(
+            *(f'-{name}' if desc else name for name, desc in fields)
+        )
+        if position is not None:
+            queryset = queryset.filter(
+                self.get_position_filter(fields, position)
+            )
+        results = list(queryset[:page_size + 1])
+        has_more = len(results) > page_size
+        results = results[:page_size]
+        if reverse:
+            results.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = position is not None
+        self.page = results
+        return results
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    def get_position_filter(self, fields, position):
+        condition = Q()
+        for index, (name, desc) in enumerate(fields):
+            step = Q(**{f'{name}__{"lt" if desc else "gt"}': position[index]})
+            for previous, (previous_name, _) in enumerate(fields[:index]):
+                step &= Q(**{previous_name: position[previous]})
+            condition |= step
+        return condition
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            data = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+            values = [
+                self.model._meta.get_field(name).to_python(value)
+                for (name, _), value in zip(self.fields, data['position'])
+            ]
+            if len(values) != len(self.fields) or None in values:
+                raise ValueError
+            return values, bool(data.get('reverse'))
+        except (TypeError, ValueError, KeyError, AttributeError,
+                ValidationError):
+            raise NotFound('Неверный курсор.')
+
+    def encode_cursor(self, instance, reverse=False):
+        position = []
+        for name, _ in self.fields:
+            value = getattr(instance, name)
+            position.append(
+                value.isoformat() if hasattr(value, 'isoformat') else value
+            )
+        data = json.dumps({'position': position, 'reverse': reverse})
+        url = self.request.build_absolute_uri()
+        return replace_query_param(
+            url,
+            self.cursor_query_param,
+            base64.urlsafe_b64encode(data.encode()).decode()
+        )
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        if not self.page:
+            return remove_query_param(self.request.build_absolute_uri(),
+                                      self.cursor_query_param)
+        return self.encode_cursor(self.page[-1])
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+
+class FeedPagination(KeysetPagination):
+    def paginate_feed(self, feed, queryset, request):
+        self.request = request
+        self.fields = [(name.lstrip('-'), name.startswith('-'))
+                       for name in self.ordering]
+        self.model = queryset.model
+        position, _ = self.decode_cursor(request)
+        page_size = self.get_page_size(request)
+        results = feed.get_page(queryset, position, page_size + 1)
+        self.has_next = len(results) > page_size
+        self.has_previous = False
+        self.page = results[:page_size]
+        return self.page
 
 
 class PaginateCustom(PageNumberPagination):
 
     page_size_query_param = 'limit'
+    django_paginator_class = CachedCountPaginator
+    mode_query_param = 'pagination'
+    cursor_query_param = KeysetPagination.cursor_query_param
+    keyset = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if (request.query_params.get(self.mode_query_param) == CURSOR_MODE
+                or self.cursor_query_param in request.query_params):
+            self.keyset = KeysetPagination()
+            return self.keyset.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
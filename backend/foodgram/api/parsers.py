@@ -0,0 +1,50 @@
+from django.conf import settings
+from django.core.files.uploadhandler import FileUploadHandler
+from rest_framework.exceptions import APIException
+from rest_framework.parsers import JSONParser, MultiPartParser
+
+
+class PayloadTooLarge(APIException):
+    status_code = 413
+    default_detail = 'Слишком большой запрос.'
+    default_code = 'payload_too_large'
+
+
+def check_content_length(request, limit):
+    try:
+        length = int(request.META.get('CONTENT_LENGTH') or 0)
+    except ValueError:
+        length = 0
+    if length > limit:
+        raise PayloadTooLarge()
+
+
+class SizeLimitUploadHandler(FileUploadHandler):
+    def __init__(self, request=None, limit=None):
+        super().__init__(request)
+        self.limit = limit
+
+    def receive_data_chunk(self, raw_data, start):
+        if start + len(raw_data) > self.limit:
+            raise PayloadTooLarge('Слишком большое изображение.')
+        return raw_data
+
+    def file_complete(self, file_size):
+        return None
+
+
+class LimitedJSONParser(JSONParser):
+    def parse(self, stream, media_type=None, parser_context=None):
+        check_content_length(parser_context['request'],
+                             settings.RECIPE_UPLOAD_MAX_SIZE)
+        return super().parse(stream, media_type, parser_context)
+
+
+class LimitedMultiPartParser(MultiPartParser):
+    def parse(self, stream, media_type=None, parser_context=None):
+        request = parser_context['request']
+        check_content_length(request, settings.RECIPE_UPLOAD_MAX_SIZE)
+        request.upload_handlers.insert(0, SizeLimitUploadHandler(
+            request._request, settings.RECIPE_IMAGE_MAX_SIZE
+        ))
+        return super().parse(stream, media_type, parser_context)
@@ -30,3 +30,11 @@ class OnlyAuthor(BasePermission):
 
     def has_permission(self, request, view):
         return request.user.is_authenticated
+
+
+class IsAdmin(BasePermission):
+    def has_permission(self, request, view):
+        user = request.user
+        return user.is_authenticated and (user.is_staff
+                                          or user.is_superuser
+                                          or user.is_admin)
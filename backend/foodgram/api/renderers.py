@@ -0,0 +1,135 @@
+import csv
+import io
+import json
+from abc import ABCMeta, abstractmethod
+
+from django.conf import settings
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.utils import simpleSplit
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFError, TTFont
+from reportlab.pdfgen import canvas
+from rest_framework.renderers import BaseRenderer
+
+TITLE = 'Список ингредиентов для покупок.'
+PDF_FONT_NAME = 'ShoppingListFont'
+PDF_FALLBACK_FONT = 'Helvetica'
+
+
+class ShoppingListRenderer(BaseRenderer, metaclass=ABCMeta):
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return b''.join(self.stream(data))
+
+    @abstractmethod
+    def stream(self, ingredients):
+        pass
+
+    @staticmethod
+    def format_line(item):
+        return (f'{item["name"]} ({item["measurement_unit"]}) - '
+                f'{item["total_amount"]}')
+
+
+class TextShoppingListRenderer(ShoppingListRenderer):
+    media_type = 'text/plain'
+    format = 'txt'
+
+    def stream(self, ingredients):
+        yield f'{TITLE}\n\n'.encode(self.charset)
+        for item in ingredients:
+            yield f'{self.format_line(item)}\n'.encode(self.charset)
+
+
+class CSVShoppingListRenderer(ShoppingListRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+
+    def stream(self, ingredients):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(('name', 'measurement_unit', 'amount'))
+        for item in ingredients:
+            writer.writerow((item['name'], item['measurement_unit'],
+                             item['total_amount']))
+            yield buffer.getvalue().encode(self.charset)
+            buffer.seek(0)
+            buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue().encode(self.charset)
+
+
+class JSONShoppingListRenderer(ShoppingListRenderer):
+    media_type = 'application/json'
+    format = 'json'
+
+    def stream(self, ingredients):
+        yield b'['
+        separator = ''
+        for item in ingredients:
+            yield (separator + json.dumps({
+                'name': item['name'],
+                'measurement_unit': item['measurement_unit'],
+                'amount': item['total_amount'],
+            }, ensure_ascii=False)).encode(self.charset)
+            separator = ', '
+        yield b']'
+
+
+class PDFShoppingListRenderer(ShoppingListRenderer):
+    media_type = 'application/pdf'
+    format = 'pdf'
+    charset = None
+    render_style = 'binary'
+    font_size = 12
+    line_height = 18
+    margin = 50
+
+    _font_name = None
+
+    @classmethod
+    def get_font_name(cls):
+        if cls._font_name is None:
+            try:
+                pdfmetrics.registerFont(
+                    TTFont(PDF_FONT_NAME, settings.SHOPPING_LIST_PDF_FONT)
+                )
+                cls._font_name = PDF_FONT_NAME
+            except (OSError, TTFError):
+                cls._font_name = PDF_FALLBACK_FONT
+        return cls._font_name
+
+    def stream(self, ingredients):
+        buffer = io.BytesIO()
+        pdf = canvas.Canvas(buffer, pagesize=A4)
+        font_name = self.get_font_name()
+        width, height = A4
+        pdf.setFont(font_name, self.font_size + 4)
+        y = height - self.margin
+        pdf.drawString(self.margin, y, TITLE)
+        y -= self.line_height * 2
+        pdf.setFont(font_name, self.font_size)
+        for item in ingredients:
+            for line in simpleSplit(f'• {self.format_line(item)}', font_name,
+                                    self.font_size, width - self.margin * 2):
+                if y < self.margin:
+                    pdf.showPage()
+                    pdf.setFont(font_name, self.font_size)
+                    y = height - self.margin
+                pdf.drawString(self.margin, y, line)
+                y -= self.line_height
+        pdf.save()
+        yield buffer.getvalue()
+
+
+SHOPPING_LIST_RENDERERS = (
+    PDFShoppingListRenderer,
+    TextShoppingListRenderer,
+    CSVShoppingListRenderer,
+    JSONShoppingListRenderer,
+)
+
+SHOPPING_LIST_RENDERERS_BY_FORMAT = {
+    renderer.format: renderer for renderer in SHOPPING_LIST_RENDERERS
+}
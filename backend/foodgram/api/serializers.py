@@ -1,13 +1,28 @@
-import webcolors
+import base64
+import binascii
+import io
+
+from django.conf import settings
 from django.core.exceptions import ValidationError
-from django.db.models import F
+from django.core.files.uploadedfile import (InMemoryUploadedFile,
+                                            TemporaryUploadedFile,
+                                            UploadedFile)
+from django.db import transaction
 from djoser.serializers import UserCreateSerializer, UserSerializer
 from drf_extra_fields.fields import Base64ImageField
+from PIL import Image
 from rest_framework import serializers
 
-from recipes.models import (CustomUser, Favorite, Follow, Ingredient,
-                            IngredientRecipe, Recipe, ShoppingCart, Tag,
-                            TagRecipe)
+from recipes.models import (Ingredient, IngredientRecipe, Recipe,
+                            ShoppingListJob, Tag)
+from recipes.relations import get_viewer_relations
+from recipes.services import set_recipe_ingredients
+from recipes.tags import get_recipe_tags, hex_to_name, tag_registry
+
+from .renderers import SHOPPING_LIST_RENDERERS_BY_FORMAT
+
+BASE64_CHUNK_SIZE = 64 * 1024
+RELATION_BATCH_MAX_SIZE = 100
 
 
 class UserSerializer(UserSerializer):
@@ -18,14 +33,11 @@ class UserSerializer(UserSerializer):
                   'last_name', 'is_subscribed')
 
     def get_is_subscribed(self, obj):
-        user = self.context['request'].user
-        if user.is_authenticated:
-            if Follow.objects.filter(
-                    user=user,
-                    author=CustomUser.objects.get(id=obj.id)).exists():
-                return True
-            return False
-        return False
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
+        return get_viewer_relations(
+            self.context['request']
+        ).is_following(obj.id)
 
 
 class CustomUserSerializer(UserCreateSerializer):
@@ -35,14 +47,97 @@ class CustomUserSerializer(UserCreateSerializer):
                   'last_name', 'password')
 
 
+class RecipeImageField(Base64ImageField):
+    default_error_messages = {
+        'too_large': 'Размер изображения превышает {max_size} байт.',
+        'too_many_pixels': 'Изображение больше {max_pixels} пикселей.',
+    }
+
+    def to_internal_value(self, data):
+        if isinstance(data, UploadedFile):
+            if data.size > settings.RECIPE_IMAGE_MAX_SIZE:
+                self.fail('too_large',
+                          max_size=settings.RECIPE_IMAGE_MAX_SIZE)
+            self.inspect(data)
+        elif isinstance(data, str) and data not in self.EMPTY_VALUES:
+            data = self.decode(data)
+        else:
+            return super().to_internal_value(data)
+        return serializers.ImageField.to_internal_value(self, data)
+
+    def decode(self, data):
+        payload = data.rpartition(';base64,')[2]
+        size = (len(payload) - payload.count('\n')
+                - payload.count('\r')) * 3 // 4
+        if size > settings.RECIPE_IMAGE_MAX_SIZE:
+            self.fail('too_large', max_size=settings.RECIPE_IMAGE_MAX_SIZE)
+        name = self.get_file_name(None)
+        if size > settings.FILE_UPLOAD_MAX_MEMORY_SIZE:
+            file = TemporaryUploadedFile(name, None, size, None)
+        else:
+            file = InMemoryUploadedFile(io.BytesIO(), None, name, None,
+                                        size, None)
+        try:
+            rest = ''
+            for start in range(0, len(payload), BASE64_CHUNK_SIZE):
+                chunk = rest + ''.join(
+                    payload[start:start + BASE64_CHUNK_SIZE].split()
+                )
+                end = len(chunk) - len(chunk) % 4
+                file.write(base64.b64decode(chunk[:end]))
+                rest = chunk[end:]
+            if rest:
+                raise ValueError
+            file.flush()
+        except (binascii.Error, ValueError):
+            file.close()
+            raise serializers.ValidationError(self.INVALID_FILE_MESSAGE)
+        file.size = file.tell()
+        extension = self.inspect(file)
+        if extension not in self.ALLOWED_TYPES:
+            file.close()
+            raise serializers.ValidationError(self.INVALID_TYPE_MESSAGE)
+        file.name = f'{name}.{extension}'
+        return file
+
+    def inspect(self, file):
+        file.seek(0)
+        try:
+            image = Image.open(file)
+            width, height = image.size
+            extension = image.format.lower()
+        except Image.DecompressionBombError:
+            self.fail('too_many_pixels',
+                      max_pixels=settings.RECIPE_IMAGE_MAX_PIXELS)
+        except (OSError, AttributeError):
+            raise serializers.ValidationError(self.INVALID_FILE_MESSAGE)
+        finally:
+            file.seek(0)
+        if width * height > settings.RECIPE_IMAGE_MAX_PIXELS:
+            self.fail('too_many_pixels',
+                      max_pixels=settings.RECIPE_IMAGE_MAX_PIXELS)
+        return 'jpg' if extension == 'jpeg' else extension
+
+
+class ThumbnailImageField(serializers.ImageField):
+    def __init__(self, **kwargs):
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def get_attribute(self, instance):
+        return instance.thumbnail or instance.image
+
+
 class RecipesSerializer(serializers.ModelSerializer):
+    image = ThumbnailImageField()
+
     class Meta:
         model = Recipe
         fields = ('id', 'name', 'image', 'cooking_time')
 
 
 class SubscribeSerializer(UserSerializer):
-    recipes_count = serializers.SerializerMethodField()
+    recipes_count = serializers.IntegerField(read_only=True)
     recipes = serializers.SerializerMethodField()
 
     class Meta(UserSerializer.Meta):
@@ -50,10 +145,9 @@ class SubscribeSerializer(UserSerializer):
         fields = ('email', 'id', 'username', 'first_name',
                   'last_name', 'is_subscribed', 'recipes', 'recipes_count')
 
-    def get_recipes_count(self, obj):
-        return obj.recipes.count()
-
     def get_recipes(self, obj):
+        if hasattr(obj, 'recipe_previews'):
+            return RecipesSerializer(obj.recipe_previews, many=True).data
         recipes = Recipe.objects.filter(author=obj)
         recipes_limit = self.context['request'].query_params.get(
             'recipes_limit'
@@ -69,10 +163,12 @@ class Hex2NameColor(serializers.Field):
 
     def to_internal_value(self, data):
         try:
-            data = webcolors.hex_to_name(data)
-        except ValueError:
+            name = hex_to_name(data)
+        except (ValueError, AttributeError):
+            name = None
+        if name is None:
             raise serializers.ValidationError('Для этого цвета нет имени')
-        return data
+        return name
 
 
 class TagSerializer(serializers.ModelSerializer):
@@ -83,11 +179,29 @@ class TagSerializer(serializers.ModelSerializer):
         fields = ('id', 'name', 'color', 'slug')
 
 
+class TagListField(serializers.ListField):
+    child = serializers.IntegerField()
+    default_error_messages = {
+        'does_not_exist': ('Недопустимый первичный ключ "{pk_value}" - '
+                           'объект не существует.'),
+    }
+
+    def to_representation(self, data):
+        return [tag.id for tag in get_recipe_tags(data.instance)]
+
+    def to_internal_value(self, data):
+        ids = super().to_internal_value(data)
+        tags = []
+        for pk in dict.fromkeys(ids):
+            tag = tag_registry.get(pk)
+            if tag is None:
+                self.fail('does_not_exist', pk_value=pk)
+            tags.append(tag)
+        return tags
+
+
 class IngredientSerializer(serializers.ModelSerializer):
-    id = serializers.PrimaryKeyRelatedField(
-        source='ingredient',
-        queryset=Ingredient.objects.all()
-    )
+    id = serializers.IntegerField()
 
     class Meta:
         model = IngredientRecipe
@@ -103,12 +217,6 @@ class IngredientSerializer(serializers.ModelSerializer):
             })
         return data
 
-    def create(self, validated_data):
-        return IngredientRecipe.objects.create(
-            ingredient=validated_data.get('id'),
-            amount=validated_data.get('amount')
-        )
-
 
 class IngredientViewSerializer(serializers.ModelSerializer):
     measurement_unit = serializers.StringRelatedField(read_only=True)
@@ -118,10 +226,24 @@ class IngredientViewSerializer(serializers.ModelSerializer):
         fields = ('id', 'name', 'measurement_unit')
 
 
+class IngredientAmountSerializer(serializers.ModelSerializer):
+    id = serializers.ReadOnlyField(source='ingredient.id')
+    name = serializers.ReadOnlyField(source='ingredient.name')
+    measurement_unit = serializers.ReadOnlyField(
+        source='ingredient.measurement_unit'
+    )
+
+    class Meta:
+        model = IngredientRecipe
+        fields = ('id', 'name', 'measurement_unit', 'amount')
+
+
 class RecipeSerializer(serializers.ModelSerializer):
     image = Base64ImageField()
-    tags = TagSerializer(many=True)
-    ingredients = serializers.SerializerMethodField()
+    tags = serializers.SerializerMethodField()
+    ingredients = IngredientAmountSerializer(source='ingredient_recipes',
+                                             many=True,
+                                             read_only=True)
     author = CustomUserSerializer()
     is_favorited = serializers.SerializerMethodField()
     is_in_shopping_cart = serializers.SerializerMethodField()
@@ -129,127 +251,94 @@ class RecipeSerializer(serializers.ModelSerializer):
     class Meta:
         model = Recipe
         fields = ('id', 'tags', 'author', 'ingredients', 'name',
-                  'image', 'text', 'is_favorited', 'is_in_shopping_cart',
-                  'name', 'cooking_time')
-        read_only_fields = ('author',)
+                  'image', 'image_webp', 'text', 'is_favorited',
+                  'is_in_shopping_cart', 'name', 'cooking_time')
+        read_only_fields = ('author', 'image_webp')
 
-    def get_ingredients(self, obj):
-        return obj.ingredients.values(
-            'id', 'name',
-            'measurement_unit',
-            amount=F('ingredient_recipes__amount')
-        )
+    def get_tags(self, obj):
+        return TagSerializer(get_recipe_tags(obj), many=True).data
 
     def get_is_favorited(self, obj):
-        user = self.context.get('request').user
-        if user.is_authenticated:
-            if Favorite.objects.filter(
-                    user=user,
-                    recipe=Recipe.objects.get(id=obj.id)).exists():
-                return True
-            return False
-        return False
+        if hasattr(obj, 'is_favorited'):
+            return obj.is_favorited
+        return get_viewer_relations(
+            self.context.get('request')
+        ).is_favorited(obj.id)
 
     def get_is_in_shopping_cart(self, obj):
-        user = self.context.get('request').user
-        if user.is_authenticated:
-            if ShoppingCart.objects.filter(
-                    user=user,
-                    recipe=Recipe.objects.get(id=obj.id)).exists():
-                return True
-            return False
-        return False
+        if hasattr(obj, 'is_in_shopping_cart'):
+            return obj.is_in_shopping_cart
+        return get_viewer_relations(
+            self.context.get('request')
+        ).is_in_shopping_cart(obj.id)
+
+
+class RecipeListSerializer(RecipeSerializer):
+    image = ThumbnailImageField()
 
 
 class WriteRecipeSerializer(serializers.ModelSerializer):
     author = CustomUserSerializer(read_only=True)
-    image = Base64ImageField()
+    image = RecipeImageField()
     ingredients = IngredientSerializer(many=True)
-    tags = serializers.SlugRelatedField(many=True,
-                                        slug_field='id',
-                                        queryset=Tag.objects.all()
-                                        )
+    tags = TagListField()
 
     def validate_ingredients(self, value):
-        ingredients = value
-        ingredients_list = []
-        for item in ingredients:
-            ingredient = item['ingredient'].id
-            if ingredient in ingredients_list:
-                raise ValidationError(
-                    'Ингредиенты не могут повторяться.'
-                )
-            ingredients_list.append(ingredient)
+        ingredients_list = [item['id'] for item in value]
+        if len(set(ingredients_list)) != len(ingredients_list):
+            raise ValidationError(
+                'Ингредиенты не могут повторяться.'
+            )
+        existing = Ingredient.objects.filter(
+            id__in=ingredients_list
+        ).values_list('id', flat=True)
+        missing = set(ingredients_list).difference(existing)
+        if missing:
+            raise ValidationError(
+                f'Недопустимый первичный ключ "{min(missing)}" - '
+                f'объект не существует.'
+            )
         return value
 
+    def save(self, **kwargs):
+        try:
+            return super().save(**kwargs)
+        finally:
+            image = self.validated_data.get('image')
+            if isinstance(image, UploadedFile):
+                image.close()
+
+    def get_amounts(self, ingredients):
+        return {item['id']: item['amount'] for item in ingredients}
+
+    @transaction.atomic
     def create(self, validated_data):
         ingredients = validated_data.pop('ingredients')
         tags = validated_data.pop('tags')
         recipe = Recipe.objects.create(**validated_data)
-        count = 0
-        for ingredient in ingredients:
-            current_ingredient = Ingredient.objects.get(
-                id=self.context.get('request').data.get(
-                    'ingredients')[count].get('id'))
-
-            IngredientRecipe.objects.create(
-                ingredient=current_ingredient,
-                recipe=recipe,
-                amount=self.context.get('request').data.get(
-                    'ingredients')[count].get('amount'))
-            count += 1
-
-        for tag in tags:
-            current_tag = Tag.objects.get(id=tag.id)
-            TagRecipe.objects.create(tags=current_tag, recipe=recipe)
+        recipe.tags.set(tags)
+        set_recipe_ingredients(recipe, self.get_amounts(ingredients))
         return recipe
 
+    @transaction.atomic
     def update(self, instance, validated_data):
-
         if 'tags' in validated_data:
-            tags_data = validated_data.pop('tags', None)
-            lst = []
-            for tag in tags_data:
-                current_tag = Tag.objects.get(id=tag.id)
-                lst.append(current_tag)
-            instance.tags.set(lst)
-
+            instance.tags.set(validated_data.pop('tags'))
         if 'ingredients' in validated_data:
-            ingredients_data = validated_data.pop('ingredients', None)
-            lst = []
-            count = 0
-            for ingredient in ingredients_data:
-                id_ingredients = self.context['request'].data.get(
-                    'ingredients')[count].get('id')
-                amount = self.context['request'].data.get(
-                    'ingredients')[count].get('amount')
-                current_ingredient = Ingredient.objects.get(id=id_ingredients)
-                if IngredientRecipe.objects.filter(
-                    recipe=instance,
-                    ingredient=current_ingredient
-                ).exists():
-                    IngredientRecipe.objects.filter(
-                        recipe=instance,
-                        ingredient=current_ingredient
-                    ).update(amount=amount)
-                else:
-                    IngredientRecipe.objects.create(
-                        recipe=instance,
-                        ingredient=current_ingredient,
-                        amount=amount
-                    )
-                count += 1
-                lst.append(current_ingredient)
-            instance.ingredients.set(lst)
-
-        instance.save()
-        super().update(instance, validated_data)
-        return instance
+            set_recipe_ingredients(
+                instance,
+                self.get_amounts(validated_data.pop('ingredients'))
+            )
+        return super().update(instance, validated_data)
 
     def to_representation(self, instance):
+        request = self.context.get('request')
+        instance = Recipe.objects.with_related().with_user_flags(
+            request.user
+        ).get(pk=instance.pk)
         return RecipeSerializer(instance,
                                 context={
-                                    'request': self.context.get('request'),
+                                    'request': request,
                                 }
                                 ).data
 
@@ -270,3 +359,41 @@ class ShoppingCartSerializer(serializers.ModelSerializer):
     class Meta:
         model = Recipe
         fields = ('id', 'name', 'image', 'cooking_time')
+
+
+class RelationBatchSerializer(serializers.Serializer):
+    add = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        max_length=RELATION_BATCH_MAX_SIZE,
+        default=list
+    )
+    remove = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        max_length=RELATION_BATCH_MAX_SIZE,
+        default=list
+    )
+
+    def validate(self, data):
+        data['add'] = list(dict.fromkeys(data['add']))
+        data['remove'] = list(dict.fromkeys(data['remove']))
+        if not data['add'] and not data['remove']:
+            raise serializers.ValidationError(
+                'Укажите рецепты для добавления или удаления.'
+            )
+        if set(data['add']).intersection(data['remove']):
+            raise serializers.ValidationError(
+                'Нельзя одновременно добавлять и удалять рецепт.'
+            )
+        return data
+
+
+class ShoppingListJobSerializer(serializers.ModelSerializer):
+    format = serializers.ChoiceField(
+        choices=tuple(SHOPPING_LIST_RENDERERS_BY_FORMAT),
+        default='pdf'
+    )
+
+    class Meta:
+        model = ShoppingListJob
+        fields = ('id', 'format', 'status', 'error', 'created')
+        read_only_fields = ('status', 'error', 'created')
@@ -0,0 +1,619 @@
+import base64
+import json
+import os
+import struct
+import tempfile
+import zlib
+from datetime import timedelta
+from io import BytesIO, StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.db import connection
+from django.db.models.fields.files import FieldFile
+from django.test import SimpleTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from PIL import Image
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfbase.pdfmetrics import stringWidth
+from reportlab.pdfgen.canvas import Canvas
+from rest_framework import serializers, status
+from rest_framework.test import APITestCase
+
+from recipes.images import process_recipe_image
+from recipes.models import (DONE, FAILED, PROCESSING, CustomUser, Favorite,
+                            FeedEntry, Follow, Ingredient, IngredientRecipe,
+                            Recipe, ShoppingCart, ShoppingListJob, Tag,
+                            TagRecipe)
+from recipes.services import get_cart_version
+
+from .jobs import (claim_pending_jobs, delete_expired_jobs,
+                   process_shopping_list_job)
+from .renderers import PDFShoppingListRenderer, ShoppingListRenderer
+from .serializers import BASE64_CHUNK_SIZE, RecipeImageField
+
+RECIPES_URL = '/api/recipes/'
+INGREDIENTS_URL = '/api/ingredients/'
+DOWNLOAD_SHOPPING_CART_URL = '/api/recipes/download_shopping_cart/'
+SHOPPING_LIST_JOBS_URL = '/api/shopping_list_jobs/'
+SUBSCRIPTIONS_URL = '/api/users/subscriptions/'
+FEED_URL = '/api/recipes/feed/'
+EXPORT_URL = '/api/recipes/export/'
+IMPORT_URL = '/api/recipes/import/'
+NDJSON = 'application/x-ndjson'
+RECIPES_COUNT = 15
+RECIPE_LIST_QUERIES = 4
+
+
+def clear_caches():
+    for alias in settings.CACHES:
+        caches[alias].clear()
+
+
+@override_settings(GENERATION_CACHE_TIMEOUT=60)
+class RecipeListQueriesTest(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(
+            username='reader', email='reader@foodgram.ru', password='pass'
+        )
+        authors = [
+            CustomUser.objects.create_user(
+                username=f'author{i}', email=f'author{i}@foodgram.ru',
+                password='pass'
+            )
+            for i in range(3)
+        ]
+        tags = [Tag.objects.create(name=f'Тег {i}', color=f'#00000{i}',
+                                   slug=f'tag{i}')
+                for i in range(3)]
+        ingredients = [Ingredient.objects.create(name=f'Продукт {i}',
+                                                 measurement_unit='г')
+                       for i in range(10)]
+        for i in range(RECIPES_COUNT):
+            recipe = Recipe.objects.create(
+                author=authors[i % len(authors)], name=f'Рецепт {i}',
+                text='Описание', cooking_time=10,
+                image='recipes/images/recipe.jpg'
+            )
+            TagRecipe.objects.bulk_create(
+                TagRecipe(recipe=recipe, tags=tag) for tag in tags[:i % 3 + 1]
+            )
+            IngredientRecipe.objects.bulk_create(
+                IngredientRecipe(recipe=recipe,
+                                 ingredient=ingredients[(i + j) % 10],
+                                 amount=j + 1)
+                for j in range(4)
+            )
+            if i % 2:
+                Favorite.objects.create(user=cls.user, recipe=recipe)
+            if i % 3:
+                ShoppingCart.objects.create(user=cls.user, recipe=recipe)
+
+    def setUp(self):
+        clear_caches()
+        self.client.force_authenticate(self.user)
+        self.client.get(RECIPES_URL, {'limit': 1})
+
+    def test_query_count_does_not_depend_on_page_size(self):
+        for limit in (6, 12):
+            with self.subTest(limit=limit):
+                with self.assertNumQueries(RECIPE_LIST_QUERIES):
+                    response = self.client.get(RECIPES_URL, {'limit': limit})
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+                self.assertEqual(len(response.data['results']), limit)
+
+
+@override_settings(GENERATION_CACHE_TIMEOUT=0)
+class TrendingEtagTest(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        author = CustomUser.objects.create_user(
+            username='author', email='author@foodgram.ru', password='pass'
+        )
+        Recipe.objects.create(author=author, name='Рецепт', text='Описание',
+                              cooking_time=10,
+                              image='recipes/images/recipe.jpg')
+
+    def setUp(self):
+        clear_caches()
+
+    def test_refresh_trending_changes_etag(self):
+        response = self.client.get(RECIPES_URL, {'ordering': 'trending'})
+        etag = response['ETag']
+        call_command('refreshtrending', '--full', stdout=StringIO())
+        clear_caches()
+        response = self.client.get(RECIPES_URL, {'ordering': 'trending'},
+                                   HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+
+
+@override_settings(GENERATION_CACHE_TIMEOUT=60)
+class QueryNormalizationTest(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        author = CustomUser.objects.create_user(
+            username='author', email='author@foodgram.ru', password='pass'
+        )
+        for i in range(3):
+            Recipe.objects.create(author=author, name=f'Рецепт {i}',
+                                  text='Описание', cooking_time=10,
+                                  image='recipes/images/recipe.jpg')
+
+    def setUp(self):
+        clear_caches()
+
+    def test_unknown_params_share_cached_response(self):
+        response = self.client.get(RECIPES_URL, {'limit': 2})
+        with self.assertNumQueries(0):
+            cached = self.client.get(RECIPES_URL, {
+                'limit': 2, 'utm_source': 'mail', '_': '1668092400'
+            })
+        self.assertEqual(cached['ETag'], response['ETag'])
+        self.assertEqual(cached.data, response.data)
+        other = self.client.get(RECIPES_URL, {'limit': 1})
+        self.assertNotEqual(other['ETag'], response['ETag'])
+        self.assertEqual(len(other.data['results']), 1)
+
+
+class SubscriptionsQueriesTest(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(
+            username='reader', email='reader@foodgram.ru', password='pass'
+        )
+        for i in range(5):
+            author = CustomUser.objects.create_user(
+                username=f'author{i}', email=f'author{i}@foodgram.ru',
+                password='pass'
+            )
+            Follow.objects.create(user=cls.user, author=author)
+            for j in range(4):
+                Recipe.objects.create(
+                    author=author, name=f'Рецепт {i}-{j}', text='Описание',
+                    cooking_time=10, image='recipes/images/recipe.jpg'
+                )
+
+    def setUp(self):
+        clear_caches()
+        self.client.force_authenticate(self.user)
+
+    def get_subscriptions(self, limit):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(SUBSCRIPTIONS_URL, {
+                'limit': limit, 'recipes_limit': 2
+            })
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data['results'], len(context)
+
+    def test_query_count_does_not_depend_on_authors(self):
+        _, queries = self.get_subscriptions(1)
+        results, more_queries = self.get_subscriptions(5)
+        self.assertEqual(more_queries, queries)
+        self.assertEqual(len(results), 5)
+        for author in results:
+            with self.subTest(author=author['username']):
+                self.assertTrue(author['is_subscribed'])
+                self.assertEqual(author['recipes_count'], 4)
+                self.assertEqual(len(author['recipes']), 2)
+
+
+class IngredientSearchTest(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        for name in ('кокосовое молоко', 'молоко', 'молоко топлёное',
+                     'мука', 'сахар'):
+            Ingredient.objects.create(name=name, measurement_unit='г')
+
+    def setUp(self):
+        clear_caches()
+
+    def search(self, name):
+        response = self.client.get(INGREDIENTS_URL, {'name': name})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [ingredient['name'] for ingredient in response.data]
+
+    def test_prefix_matches_rank_before_substring_and_fuzzy(self):
+        self.assertEqual(self.search('Молоко'), [
+            'молоко', 'молоко топлёное', 'кокосовое молоко'
+        ])
+        self.assertEqual(self.search('кокос'), ['кокосовое молоко'])
+        self.assertEqual(self.search('малоко')[0], 'молоко')
+
+    def test_new_ingredient_is_found(self):
+        self.search('сах')
+        Ingredient.objects.create(name='сахарная пудра',
+                                  measurement_unit='г')
+        self.assertEqual(self.search('сахарн')[0], 'сахарная пудра')
+
+
+class CursorPaginationTest(APITestCase):
+    def test_malformed_cursor_returns_not_found(self):
+        positions = (['garbage', 1], [None, 1],
+                     ['2022-11-10T15:10:00+00:00', 'x'])
+        for position in positions:
+            with self.subTest(position=position):
+                cursor = base64.urlsafe_b64encode(
+                    json.dumps({'position': position}).encode()
+                ).decode()
+                response = self.client.get(RECIPES_URL, {'cursor': cursor})
+                self.assertEqual(response.status_code,
+                                 status.HTTP_404_NOT_FOUND)
+
+
+def make_png(width, height):
+    buffer = BytesIO()
+    Image.new('RGB', (1, 1)).save(buffer, 'PNG')
+    data = buffer.getvalue()
+    header = b'IHDR' + struct.pack('>II', width, height) + data[24:29]
+    return (data[:12] + header
+            + struct.pack('>I', zlib.crc32(header)) + data[33:])
+
+
+class RecipeImageFieldTest(SimpleTestCase):
+    def test_decompression_bomb_is_rejected(self):
+        payload = base64.b64encode(make_png(20000, 20000)).decode()
+        with self.assertRaises(serializers.ValidationError) as context:
+            RecipeImageField().to_internal_value(
+                f'data:image/png;base64,{payload}'
+            )
+        self.assertEqual(context.exception.detail[0].code, 'too_many_pixels')
+
+    def test_line_wrapped_base64_is_decoded(self):
+        buffer = BytesIO()
+        Image.frombytes('RGB', (200, 200), os.urandom(200 * 200 * 3)).save(
+            buffer, 'PNG'
+        )
+        payload = base64.encodebytes(buffer.getvalue()).decode()
+        self.assertGreater(len(payload), BASE64_CHUNK_SIZE)
+        image = RecipeImageField().to_internal_value(
+            f'data:image/png;base64,{payload}'
+        )
+        image.seek(0)
+        self.assertEqual(image.read(), buffer.getvalue())
+
+
+class ShoppingListRendererTest(SimpleTestCase):
+    def test_base_renderer_is_abstract(self):
+        with self.assertRaises(TypeError):
+            ShoppingListRenderer()
+
+    def test_long_pdf_lines_are_wrapped(self):
+        renderer = PDFShoppingListRenderer()
+        name = ' '.join(['Очень длинное название продукта'] * 10)
+        with mock.patch.object(Canvas, 'drawString',
+                               autospec=True) as draw_string:
+            renderer.render([{'name': name, 'measurement_unit': 'г',
+                              'total_amount': 1}])
+        lines = [args[3] for args, _ in draw_string.call_args_list[1:]]
+        self.assertGreater(len(lines), 1)
+        self.assertEqual(' '.join(lines), f'• {name} (г) - 1')
+        max_width = A4[0] - renderer.margin * 2
+        for line in lines:
+            self.assertLessEqual(
+                stringWidth(line, renderer.get_font_name(),
+                            renderer.font_size),
+                max_width
+            )
+
+
+@override_settings(IMAGE_PIPELINE_WORKERS=0, MEDIA_ROOT=tempfile.mkdtemp())
+class RecipeImageVariantsTest(APITestCase):
+    def setUp(self):
+        clear_caches()
+        buffer = BytesIO()
+        Image.new('RGB', (1200, 800), 'orange').save(buffer, 'PNG')
+        author = CustomUser.objects.create_user(
+            username='author', email='author@foodgram.ru', password='pass'
+        )
+        self.recipe = Recipe.objects.create(
+            author=author, name='Рецепт', text='Описание', cooking_time=10,
+            image=default_storage.save('recipes/images/recipe.png',
+                                       ContentFile(buffer.getvalue()))
+        )
+
+    def test_list_serves_thumbnail_and_webp(self):
+        self.assertTrue(process_recipe_image(self.recipe.id))
+        self.recipe.refresh_from_db()
+        response = self.client.get(RECIPES_URL, {'limit': 6})
+        recipe = response.data['results'][0]
+        self.assertTrue(recipe['image'].endswith(self.recipe.thumbnail.url))
+        self.assertTrue(
+            recipe['image_webp'].endswith(self.recipe.image_webp.url)
+        )
+        with self.recipe.thumbnail.open('rb') as file:
+            thumbnail = Image.open(file)
+            self.assertEqual(thumbnail.format, 'WEBP')
+            self.assertLessEqual(max(thumbnail.size),
+                                 max(settings.RECIPE_THUMBNAIL_SIZE))
+
+
+@override_settings(IMAGE_PIPELINE_WORKERS=0, MEDIA_ROOT=tempfile.mkdtemp())
+class RecipeTransferTest(APITestCase):
+    def setUp(self):
+        clear_caches()
+        self.admin = CustomUser.objects.create_user(
+            username='admin', email='admin@foodgram.ru', password='pass',
+            is_staff=True
+        )
+        recipe = Recipe.objects.create(
+            author=self.admin, name='Рецепт', text='Описание',
+            cooking_time=10,
+            image=default_storage.save('recipes/images/recipe.png',
+                                       ContentFile(make_png(1, 1)))
+        )
+        TagRecipe.objects.create(recipe=recipe, tags=Tag.objects.create(
+            name='Завтрак', color='#E26C2D', slug='breakfast'
+        ))
+        IngredientRecipe.objects.create(
+            recipe=recipe, amount=200,
+            ingredient=Ingredient.objects.create(name='мука',
+                                                 measurement_unit='г')
+        )
+        self.client.force_authenticate(self.admin)
+
+    def export(self):
+        response = self.client.get(EXPORT_URL)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return b''.join(response.streaming_content)
+
+    def import_lines(self, lines):
+        response = self.client.post(IMPORT_URL, lines, content_type=NDJSON)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data
+
+    def test_round_trip_is_idempotent(self):
+        exported = self.export()
+        self.assertIn(b'"image": "data:image/png;base64,', exported)
+        Recipe.objects.all().delete()
+        result = self.import_lines(exported)
+        self.assertEqual((result['created'], result['skipped'],
+                          result['failed']), (1, 0, 0))
+        self.assertEqual(self.export(), exported)
+        result = self.import_lines(exported)
+        self.assertEqual((result['created'], result['skipped'],
+                          result['failed']), (0, 1, 0))
+        self.assertEqual(Recipe.objects.count(), 1)
+        self.assertEqual(self.export(), exported)
+
+
+@override_settings(IMAGE_PIPELINE_WORKERS=0, MEDIA_ROOT=tempfile.mkdtemp())
+class FollowingFeedTest(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = CustomUser.objects.create_user(
+            username='author', email='author@foodgram.ru', password='pass'
+        )
+        cls.follower = CustomUser.objects.create_user(
+            username='follower', email='follower@foodgram.ru',
+            password='pass'
+        )
+        cls.tag = Tag.objects.create(name='Ужин', color='#000000',
+                                     slug='dinner')
+        cls.ingredient = Ingredient.objects.create(name='Рис',
+                                                   measurement_unit='г')
+
+    def setUp(self):
+        clear_caches()
+        self.client.force_authenticate(self.follower)
+        response = self.client.post(
+            f'/api/users/{self.author.id}/subscribe/'
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    def publish(self, name):
+        self.client.force_authenticate(self.author)
+        payload = base64.b64encode(make_png(1, 1)).decode()
+        response = self.client.post(RECIPES_URL, {
+            'name': name, 'text': 'Описание', 'cooking_time': 10,
+            'image': f'data:image/png;base64,{payload}',
+            'tags': [self.tag.id],
+            'ingredients': [{'id': self.ingredient.id, 'amount': 100}],
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.client.force_authenticate(self.follower)
+        return response.data['id']
+
+    def get_feed(self):
+        response = self.client.get(FEED_URL)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [recipe['id'] for recipe in response.data['results']]
+
+    def test_new_recipe_is_fanned_out_to_followers(self):
+        recipe_id = self.publish('Плов')
+        self.assertTrue(FeedEntry.objects.filter(
+            user=self.follower, recipe_id=recipe_id
+        ).exists())
+        self.assertEqual(self.get_feed(), [recipe_id])
+
+    @override_settings(FEED_FANOUT_MAX_FOLLOWERS=0)
+    def test_large_author_recipe_is_read_on_request(self):
+        recipe_id = self.publish('Ризотто')
+        self.assertFalse(FeedEntry.objects.exists())
+        self.assertEqual(self.get_feed(), [recipe_id])
+
+
+@override_settings(SHOPPING_LIST_JOB_TIMEOUT=60,
+                   SHOPPING_LIST_JOB_RETENTION=60 * 60,
+                   MEDIA_ROOT=tempfile.mkdtemp())
+class ShoppingListJobTest(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(
+            username='buyer', email='buyer@foodgram.ru', password='pass'
+        )
+
+    def setUp(self):
+        clear_caches()
+        self.client.force_authenticate(self.user)
+
+    def create_job(self, status, claimed_at=None):
+        return ShoppingListJob.objects.create(
+            user=self.user, format='txt', status=status,
+            cart_version=get_cart_version(self.user.id),
+            claimed_at=claimed_at
+        )
+
+    def test_stale_processing_jobs_are_reclaimed(self):
+        stale = self.create_job(
+            PROCESSING, timezone.now() - timedelta(minutes=5)
+        )
+        self.create_job(PROCESSING, timezone.now())
+        self.assertEqual(claim_pending_jobs(limit=10), [stale.id])
+
+    def test_stale_processing_job_is_not_reused(self):
+        stale = self.create_job(
+            PROCESSING, timezone.now() - timedelta(minutes=5)
+        )
+        response = self.client.post(SHOPPING_LIST_JOBS_URL,
+                                    {'format': 'txt'})
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertNotEqual(response.data['id'], stale.id)
+
+    def test_failed_file_save_marks_job_failed(self):
+        job = self.create_job(PROCESSING, timezone.now())
+        with mock.patch.object(FieldFile, 'save', side_effect=OSError):
+            self.assertEqual(process_shopping_list_job(job.id), FAILED)
+        job.refresh_from_db()
+        self.assertEqual(job.status, FAILED)
+
+    def create_done_job(self, created):
+        job = self.create_job(DONE)
+        job.file.save(f'{job.id}.txt', ContentFile(b'list'))
+        ShoppingListJob.objects.filter(id=job.id).update(created=created)
+        return job
+
+    def test_failed_job_is_terminal(self):
+        job = self.create_job(FAILED)
+        job.error = 'Ошибка'
+        job.save()
+        response = self.client.get(f'{SHOPPING_LIST_JOBS_URL}{job.id}/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['status'], FAILED)
+        self.assertEqual(response.data['error'], 'Ошибка')
+
+    def test_expired_jobs_and_files_are_deleted(self):
+        expired = self.create_done_job(timezone.now() - timedelta(hours=2))
+        fresh = self.create_done_job(timezone.now())
+        self.assertEqual(delete_expired_jobs(), 1)
+        self.assertFalse(expired.file.storage.exists(expired.file.name))
+        self.assertFalse(ShoppingListJob.objects.filter(
+            id=expired.id
+        ).exists())
+        self.assertTrue(fresh.file.storage.exists(fresh.file.name))
+
+    def test_finished_job_replaces_older_file_of_same_cart(self):
+        older = self.create_done_job(timezone.now() - timedelta(minutes=5))
+        job = self.create_job(PROCESSING, timezone.now())
+        self.assertEqual(process_shopping_list_job(job.id), DONE)
+        self.assertFalse(older.file.storage.exists(older.file.name))
+        self.assertEqual(
+            list(ShoppingListJob.objects.values_list('id', flat=True)),
+            [job.id]
+        )
+
+
+class ShoppingListDownloadTest(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(
+            username='buyer', email='buyer@foodgram.ru', password='pass'
+        )
+        recipe = Recipe.objects.create(
+            author=cls.user, name='Рецепт', text='Описание', cooking_time=10,
+            image='recipes/images/recipe.jpg'
+        )
+        for i in range(3):
+            IngredientRecipe.objects.create(
+                recipe=recipe, amount=i + 1,
+                ingredient=Ingredient.objects.create(name=f'Продукт {i}',
+                                                     measurement_unit='г')
+            )
+        ShoppingCart.objects.create(user=cls.user, recipe=recipe)
+
+    def setUp(self):
+        clear_caches()
+        self.client.force_authenticate(self.user)
+
+    def test_first_download_is_streamed_and_then_cached(self):
+        response = self.client.get(DOWNLOAD_SHOPPING_CART_URL,
+                                   {'format': 'txt'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        content = b''.join(response.streaming_content)
+        self.assertIn('Продукт 2 (г) - 3'.encode(), content)
+        response = self.client.get(DOWNLOAD_SHOPPING_CART_URL,
+                                   {'format': 'txt'})
+        self.assertFalse(response.streaming)
+        self.assertEqual(response.content, content)
+
+    def test_ingredient_rename_invalidates_cached_list(self):
+        response = self.client.get(DOWNLOAD_SHOPPING_CART_URL,
+                                   {'format': 'txt'})
+        b''.join(response.streaming_content)
+        ingredient = Ingredient.objects.get(name='Продукт 2')
+        ingredient.name = 'Мука'
+        ingredient.save()
+        response = self.client.get(DOWNLOAD_SHOPPING_CART_URL,
+                                   {'format': 'txt'},
+                                   HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('Мука (г) - 3'.encode(),
+                      b''.join(response.streaming_content))
+
+
+class RecipeDetailValidatorsTest(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        author = CustomUser.objects.create_user(
+            username='author', email='author@foodgram.ru', password='pass'
+        )
+        cls.recipe = Recipe.objects.create(
+            author=author, name='Рецепт', text='Описание', cooking_time=10,
+            image='recipes/images/recipe.jpg'
+        )
+        cls.link = IngredientRecipe.objects.create(
+            recipe=cls.recipe, amount=1,
+            ingredient=Ingredient.objects.create(name='Продукт',
+                                                 measurement_unit='г')
+        )
+        cls.tag = Tag.objects.create(name='Тег', color='#000000', slug='tag')
+        past = timezone.now() - timedelta(hours=1)
+        Recipe.objects.update(pub_date=past, updated_at=past)
+
+    def setUp(self):
+        clear_caches()
+        self.url = f'{RECIPES_URL}{self.recipe.id}/'
+
+    def assert_changed(self, response, check):
+        for header, validator in (('HTTP_IF_NONE_MATCH', 'ETag'),
+                                  ('HTTP_IF_MODIFIED_SINCE',
+                                   'Last-Modified')):
+            with self.subTest(header=header):
+                clear_caches()
+                changed = self.client.get(
+                    self.url, **{header: response[validator]}
+                )
+                self.assertEqual(changed.status_code, status.HTTP_200_OK)
+                check(changed.data)
+
+    def test_ingredient_link_edit_changes_validators(self):
+        response = self.client.get(self.url)
+        self.link.amount = 5
+        self.link.save()
+        self.assert_changed(response, lambda data: self.assertEqual(
+            data['ingredients'][0]['amount'], 5
+        ))
+
+    def test_tag_link_edit_changes_validators(self):
+        response = self.client.get(self.url)
+        TagRecipe.objects.create(recipe=self.recipe, tags=self.tag)
+        self.assert_changed(response, lambda data: self.assertEqual(
+            [tag['id'] for tag in data['tags']], [self.tag.id]
+        ))
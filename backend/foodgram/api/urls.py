@@ -1,7 +1,8 @@
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
-from .views import IngredientViewSet, RecipeViewSet, TagViewSet, UserViewSet
+from .views import (IngredientViewSet, RecipeViewSet, ShoppingListJobViewSet,
+                    TagViewSet, UserViewSet)
 
 router = DefaultRouter()
 
@@ -9,6 +10,8 @@ router.register('tags', TagViewSet, basename='tags')
 router.register('ingredients', IngredientViewSet, basename='ingredients')
 router.register('recipes', RecipeViewSet, basename='recipes')
 router.register('users', UserViewSet, basename='follow')
+router.register('shopping_list_jobs', ShoppingListJobViewSet,
+                basename='shopping_list_jobs')
 
 
 urlpatterns = [
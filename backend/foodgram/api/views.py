@@ -1,62 +1,120 @@
-import pdfkit
-from django.core.exceptions import ValidationError
-from django.http import HttpResponse
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import BooleanField, OuterRef, Prefetch, Subquery, Value
+from django.http import (FileResponse, Http404, HttpResponse,
+                         StreamingHttpResponse)
 from django.shortcuts import get_object_or_404
-from django.template import loader
+from django.utils.cache import get_conditional_response
 from django_filters.rest_framework import DjangoFilterBackend
 from djoser.views import UserViewSet
-from rest_framework import status, viewsets
+from rest_framework import mixins, status, viewsets
 from rest_framework.decorators import action
+from rest_framework.parsers import FormParser
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
 
-from recipes.models import (CustomUser, Favorite, Follow, Ingredient, Recipe,
-                            ShoppingCart, Tag)
+from recipes.feed import (FollowingFeed, backfill_feed, clear_feed,
+                          fan_out_recipe)
+from recipes.models import (DONE, FAILED, CustomUser, Ingredient, Recipe,
+                            ShoppingListJob, Tag)
+from recipes.relations import (CART_RECIPES, FAVORITE_RECIPES,
+                               FOLLOWED_AUTHORS, add_relation, apply_relations,
+                               remove_relation)
+from recipes.search import ingredient_index, search_ingredients
+from recipes.services import (INGREDIENTS, RECIPES, SCORES, TAGS, USERS,
+                              get_cart_version, get_shopping_list)
+from recipes.tags import tag_registry
+from recipes.transfer import RecipeImporter, export_recipes
 
-from .filters import RecipeFilter, SearchIngredient
-from .pagination import PaginateCustom
-from .permissions import AuthorOrStaffOrReadOnly, IsAdminOrReadOnly, OnlyAuthor
-from .serializers import (FavoriteSerializer, IngredientRecipe,
-                          IngredientViewSerializer, RecipeSerializer,
-                          ShoppingCartSerializer, SubscribeSerializer,
+from .filters import (NEWEST, POPULAR, RECIPE_ORDERINGS, TRENDING,
+                      RecipeFilter, SearchIngredient)
+from .jobs import stale_jobs
+from .mixins import AnonymousResponseCacheMixin, ConditionalGetMixin
+from .pagination import FeedPagination, PaginateCustom
+from .parsers import LimitedJSONParser, LimitedMultiPartParser
+from .permissions import (AuthorOrStaffOrReadOnly, IsAdmin, IsAdminOrReadOnly,
+                          OnlyAuthor)
+from .renderers import (SHOPPING_LIST_RENDERERS,
+                        SHOPPING_LIST_RENDERERS_BY_FORMAT)
+from .serializers import (FavoriteSerializer, IngredientViewSerializer,
+                          RecipeListSerializer, RecipeSerializer,
+                          RelationBatchSerializer, ShoppingCartSerializer,
+                          ShoppingListJobSerializer, SubscribeSerializer,
                           TagSerializer, UserSerializer, WriteRecipeSerializer)
 
 ONE = '1'
+ZERO = '0'
+NDJSON = 'application/x-ndjson'
+PREFIX_MODE = 'prefix'
+SHOPPING_LIST_FILENAME = 'Список Покупок'
+SHOPPING_LIST_CACHE_KEY = 'shopping_list:{user_id}:{format}:{version}'
+
+
+def error_response(message):
+    return Response({'errors': message}, status=status.HTTP_400_BAD_REQUEST)
+
+
+def cache_chunks(key, chunks, timeout):
+    parts = []
+    for chunk in chunks:
+        parts.append(chunk)
+        yield chunk
+    cache.set(key, b''.join(parts), timeout)
+
+
+def missing_relation_response(model, pk, message):
+    if not model.objects.filter(id=pk).exists():
+        raise Http404
+    return error_response(message)
 
 
 class UserViewSet(UserViewSet):
     queryset = CustomUser.objects.all()
     serializer_class = UserSerializer
     pagination_class = PaginateCustom
+    keyset_ordering = ('username', 'id')
 
     @action(detail=True,
             methods=['post', 'delete'],
             permission_classes=[IsAuthenticated])
     def subscribe(self, request, id=None):
-        author = get_object_or_404(CustomUser, id=id)
         if request.method == 'POST':
+            author = get_object_or_404(CustomUser, id=id)
+            if author == request.user:
+                return error_response('Нельзя подписаться на самого себя')
+            if not add_relation(FOLLOWED_AUTHORS, request.user.id, author.id):
+                return error_response('Вы уже подписаны на пользователя')
+            backfill_feed(request.user.id, [author.id])
             serializer = SubscribeSerializer(
                 author, context={'request': request}
             )
-            Follow.objects.get_or_create(
-                user=request.user, author=author
-            )
-            return Response(serializer.data)
-
-        if Follow.objects.filter(user=request.user,
-                                 author=author).exists():
-            Follow.objects.get(user=request.user,
-                               author=author).delete()
+            return Response(serializer.data, status=status.HTTP_201_CREATED)
+        if remove_relation(FOLLOWED_AUTHORS, request.user.id, id):
+            clear_feed(request.user.id, id)
             return Response(status=status.HTTP_204_NO_CONTENT)
-        raise ValidationError(
-            {'errors': 'Вы не подписаны на пользователя'}
-        )
+        return missing_relation_response(CustomUser, id,
+                                         'Вы не подписаны на пользователя')
 
     @action(detail=False,
             methods=['get'],
             permission_classes=[OnlyAuthor])
     def subscriptions(self, request):
-        user = CustomUser.objects.filter(following__user=self.request.user)
+        recipes = Recipe.objects.all()
+        recipes_limit = request.query_params.get('recipes_limit')
+        if recipes_limit and recipes_limit.isdigit():
+            recipes = recipes.filter(id__in=Subquery(
+                Recipe.objects.filter(
+                    author=OuterRef('author')
+                ).values('id')[:int(recipes_limit)]
+            ))
+        user = CustomUser.objects.filter(
+            following__user=self.request.user
+        ).annotate(
+            is_subscribed=Value(True, output_field=BooleanField())
+        ).prefetch_related(
+            Prefetch('recipes', queryset=recipes, to_attr='recipe_previews')
+        ).order_by('username')
         page = self.paginate_queryset(user)
         serializer = SubscribeSerializer(
             page, context={'request': request},
@@ -65,43 +123,116 @@ class UserViewSet(UserViewSet):
         return self.get_paginated_response(serializer.data)
 
 
-class TagViewSet(viewsets.ModelViewSet):
+class TagViewSet(ConditionalGetMixin, AnonymousResponseCacheMixin,
+                 viewsets.ModelViewSet):
+    cache_generations = etag_generations = (TAGS,)
     queryset = Tag.objects.all()
     pagination_class = None
     serializer_class = TagSerializer
     permission_classes = (IsAdminOrReadOnly,)
 
+    def filter_queryset(self, queryset):
+        if self.action == 'list':
+            return tag_registry.all()
+        return super().filter_queryset(queryset)
+
+    def get_object(self):
+        if self.action != 'retrieve':
+            return super().get_object()
+        try:
+            tag = tag_registry.get(int(self.kwargs[self.lookup_field]))
+        except ValueError:
+            tag = None
+        if tag is None:
+            raise Http404
+        self.check_object_permissions(self.request, tag)
+        return tag
+
 
-class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
+class IngredientViewSet(ConditionalGetMixin, AnonymousResponseCacheMixin,
+                        viewsets.ReadOnlyModelViewSet):
+    cache_generations = etag_generations = (INGREDIENTS,)
+    cache_query_params = ('mode',)
     queryset = Ingredient.objects.all()
     pagination_class = None
     filter_backends = (SearchIngredient,)
     search_fields = ('^name',)
     serializer_class = IngredientViewSerializer
 
+    def filter_queryset(self, queryset):
+        name = self.request.query_params.get(SearchIngredient.search_param)
+        if self.action != 'list' or not name:
+            return super().filter_queryset(queryset)
+        if self.request.query_params.get('mode') == PREFIX_MODE:
+            return ingredient_index.prefix(
+                name, limit=settings.INGREDIENT_SEARCH_LIMIT
+            )
+        return search_ingredients(
+            name, limit=settings.INGREDIENT_SEARCH_LIMIT
+        )
+
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(ConditionalGetMixin, AnonymousResponseCacheMixin,
+                    viewsets.ModelViewSet):
+    cache_generations = etag_generations = (RECIPES, TAGS, INGREDIENTS)
+    object_etag_generations = (TAGS, INGREDIENTS, USERS)
+    etag_per_viewer = True
+    cache_query_params = ('is_favorited', 'is_in_shopping_cart')
     permission_classes = (AuthorOrStaffOrReadOnly,)
     filter_backends = (DjangoFilterBackend,)
     filterset_class = RecipeFilter
     pagination_class = PaginateCustom
+    parser_classes = (LimitedJSONParser, FormParser, LimitedMultiPartParser)
 
     def get_queryset(self):
-        queryset = Recipe.objects.all()
+        queryset = Recipe.objects.with_related().with_user_flags(
+            self.request.user)
         is_favorite = self.request.query_params.get('is_favorited')
         if is_favorite == ONE:
-            queryset = queryset.filter(favorite__user=self.request.user)
+            queryset = queryset.filter(is_favorited=True)
         is_in_shopping_cart = self.request.query_params.get(
             'is_in_shopping_cart')
         if is_in_shopping_cart == ONE:
-            queryset = queryset.filter(shop__user=self.request.user)
+            queryset = queryset.filter(is_in_shopping_cart=True)
         return queryset
 
+    @property
+    def keyset_ordering(self):
+        return RECIPE_ORDERINGS.get(self.request.query_params.get('ordering'),
+                                    RECIPE_ORDERINGS[NEWEST])
+
+    def get_ordering_generations(self):
+        if self.request.query_params.get('ordering') in (POPULAR, TRENDING):
+            return (SCORES,)
+        return ()
+
+    def get_etag_generations(self):
+        return (super().get_etag_generations()
+                + self.get_ordering_generations())
+
+    def get_cache_generations(self):
+        return (super().get_cache_generations()
+                + self.get_ordering_generations())
+
+    def get_object_validators(self, lookup):
+        try:
+            dates = Recipe.objects.filter(pk=lookup).values_list(
+                'pub_date', 'updated_at').first()
+        except ValueError:
+            return None
+        if dates is None:
+            return None
+        last_modified = max(dates)
+        return (lookup, last_modified.isoformat()), last_modified
+
     def perform_create(self, serializer):
-        serializer.save(author=self.request.user)
+        recipe = serializer.save(author=self.request.user)
+        fan_out_recipe(recipe)
 
     def get_serializer_class(self):
-        if self.action in ('retrieve', 'list'):
+        if self.action in ('list', 'feed'):
+            return RecipeListSerializer
+        if self.action == 'retrieve':
             return RecipeSerializer
         return WriteRecipeSerializer
 
@@ -109,70 +240,173 @@ class RecipeViewSet(viewsets.ModelViewSet):
             methods=['post', 'delete'],
             permission_classes=[IsAuthenticated])
     def favorite(self, request, pk):
-        recipe = get_object_or_404(Recipe, id=pk)
-        if request.method == 'POST':
-            if Favorite.objects.filter(
-                    user=request.user,
-                    recipe=recipe).exists():
-                return Response('Нельзя добавлять дважды')
-            Favorite.objects.create(
-                user=request.user, recipe=recipe)
-            serializer = FavoriteSerializer(recipe)
-            return Response(serializer.data)
-
-        favorite = Favorite.objects.get(
-            user=request.user, recipe=recipe)
-        favorite.delete()
-        return Response(status=status.HTTP_204_NO_CONTENT)
+        return self.toggle_relation(
+            request, pk, FAVORITE_RECIPES, FavoriteSerializer,
+            'Рецепт уже в избранном', 'Рецепта нет в избранном'
+        )
 
     @action(detail=True,
             methods=['post', 'delete'],
             permission_classes=[IsAuthenticated])
     def shopping_cart(self, request, pk):
-        recipe = get_object_or_404(Recipe, id=pk)
-        if request.method == 'POST':
-            if ShoppingCart.objects.filter(
-                    user=request.user,
-                    recipe=recipe).exists():
-                return Response('Нельзя добавлять дважды',
-                                status=status.HTTP_400_BAD_REQUEST)
-            ShoppingCart.objects.create(
-                user=request.user, recipe=recipe)
-            serializer = ShoppingCartSerializer(recipe)
-            return Response(serializer.data)
-
-        favorite = ShoppingCart.objects.get(
-            user=request.user, recipe=recipe)
-        favorite.delete()
-        return Response(status=status.HTTP_204_NO_CONTENT)
+        return self.toggle_relation(
+            request, pk, CART_RECIPES, ShoppingCartSerializer,
+            'Рецепт уже в списке покупок', 'Рецепта нет в списке покупок'
+        )
 
     @action(detail=False,
             methods=['get'],
             permission_classes=[IsAuthenticated])
+    def feed(self, request):
+        paginator = FeedPagination()
+        recipes = paginator.paginate_feed(
+            FollowingFeed(request.user), self.get_queryset(), request
+        )
+        serializer = self.get_serializer(recipes, many=True)
+        return paginator.get_paginated_response(serializer.data)
+
+    @action(detail=False,
+            methods=['post'],
+            url_path='favorite',
+            url_name='favorite-batch',
+            permission_classes=[IsAuthenticated])
+    def favorite_batch(self, request):
+        return self.apply_relation_batch(request, FAVORITE_RECIPES)
+
+    @action(detail=False,
+            methods=['post'],
+            url_path='shopping_cart',
+            url_name='shopping-cart-batch',
+            permission_classes=[IsAuthenticated])
+    def shopping_cart_batch(self, request):
+        return self.apply_relation_batch(request, CART_RECIPES)
+
+    def apply_relation_batch(self, request, kind):
+        serializer = RelationBatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        results = apply_relations(kind, request.user.id,
+                                  serializer.validated_data['add'],
+                                  serializer.validated_data['remove'])
+        return Response({'results': [
+            {'id': recipe_id, 'status': result}
+            for recipe_id, result in results.items()
+        ]})
+
+    def toggle_relation(self, request, pk, kind, serializer_class,
+                        exists_message, missing_message):
+        if request.method == 'POST':
+            recipe = get_object_or_404(
+                Recipe.objects.only('id', 'name', 'image', 'cooking_time'),
+                id=pk
+            )
+            if not add_relation(kind, request.user.id, recipe.id):
+                return error_response(exists_message)
+            return Response(serializer_class(recipe).data,
+                            status=status.HTTP_201_CREATED)
+        if remove_relation(kind, request.user.id, pk):
+            return Response(status=status.HTTP_204_NO_CONTENT)
+        return missing_relation_response(Recipe, pk, missing_message)
+
+    @action(detail=False,
+            methods=['get'],
+            permission_classes=[IsAuthenticated],
+            renderer_classes=SHOPPING_LIST_RENDERERS)
     def download_shopping_cart(self, request):
-        recipes = Recipe.objects.filter(shop__user=request.user)
-        recipe = []
-        for i in recipes:
-            recipe.append(i.id)
-        ing_recipes = {}
-        ingredients_recipes = IngredientRecipe.objects.filter(
-            recipe__in=recipe)
-        for i in ingredients_recipes:
-            if not i.ingredient.name in ing_recipes:
-                ing_recipes[i.ingredient.name] = [
-                    i.ingredient.measurement_unit, i.amount]
-            else:
-                amount = ing_recipes.get(i.ingredient.name)
-                new_amount = amount[1] + i.amount
-                ing_recipes[i.ingredient.name] = [
-                    i.ingredient.measurement_unit, new_amount]
-        template = loader.get_template('text.html')
-        context = {
-            'ing_recipes': ing_recipes
-        }
-        html = template.render(context, request)
-        dirr = pdfkit.from_string(html, False)
-        response = HttpResponse(dirr, content_type='application/pdf')
+        renderer = request.accepted_renderer
+        version = get_cart_version(request.user.id)
+        etag = f'"{request.user.id}-{version}-{renderer.format}"'
+        not_modified = get_conditional_response(request, etag=etag)
+        if not_modified is not None:
+            return not_modified
+        key = SHOPPING_LIST_CACHE_KEY.format(user_id=request.user.id,
+                                             format=renderer.format,
+                                             version=version)
+        content_type = renderer.media_type
+        if renderer.charset:
+            content_type = f'{content_type}; charset={renderer.charset}'
+        content = cache.get(key)
+        if content is None:
+            response = StreamingHttpResponse(cache_chunks(
+                key,
+                renderer.stream(get_shopping_list(request.user).iterator()),
+                settings.SHOPPING_LIST_CACHE_TIMEOUT
+            ), content_type=content_type)
+        else:
+            response = HttpResponse(content, content_type=content_type)
+        response['ETag'] = etag
         response['Content-Disposition'] = (
-            'attachment; filename="Список Покупок.pdf"')
+            f'attachment; filename="{SHOPPING_LIST_FILENAME}.'
+            f'{renderer.format}"')
         return response
+
+    @action(detail=False,
+            methods=['get'],
+            url_path='export',
+            permission_classes=[IsAdmin])
+    def export_ndjson(self, request):
+        lines = export_recipes(
+            self.filter_queryset(Recipe.objects.all()),
+            include_images=request.query_params.get('images') != ZERO
+        )
+        return StreamingHttpResponse(lines, content_type=NDJSON)
+
+    @action(detail=False,
+            methods=['post'],
+            url_path='import',
+            permission_classes=[IsAdmin])
+    def import_ndjson(self, request):
+        importer = RecipeImporter(author=request.user).run(
+            request.stream or ()
+        )
+        return Response({
+            'created': importer.created,
+            'skipped': importer.skipped,
+            'failed': importer.failed,
+            'errors': [{'line': number, 'error': message}
+                       for number, message in importer.errors],
+        })
+
+    def handle_exception(self, exc):
+        response = super().handle_exception(exc)
+        if self.action == 'download_shopping_cart':
+            self.request.accepted_renderer = JSONRenderer()
+            self.request.accepted_media_type = JSONRenderer.media_type
+        return response
+
+
+class ShoppingListJobViewSet(mixins.CreateModelMixin,
+                             mixins.RetrieveModelMixin,
+                             viewsets.GenericViewSet):
+    serializer_class = ShoppingListJobSerializer
+    permission_classes = (IsAuthenticated,)
+
+    def get_queryset(self):
+        return ShoppingListJob.objects.filter(user=self.request.user)
+
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        version = get_cart_version(request.user.id)
+        job = self.get_queryset().filter(
+            format=serializer.validated_data['format'],
+            cart_version=version
+        ).exclude(status=FAILED).exclude(stale_jobs()).first()
+        if job is None:
+            job = serializer.save(user=request.user, cart_version=version)
+        return Response(self.get_serializer(job).data,
+                        status=status.HTTP_202_ACCEPTED)
+
+    def retrieve(self, request, *args, **kwargs):
+        job = self.get_object()
+        if job.status == FAILED:
+            return Response(self.get_serializer(job).data)
+        if job.status != DONE:
+            return Response(self.get_serializer(job).data,
+                            status=status.HTTP_202_ACCEPTED)
+        renderer = SHOPPING_LIST_RENDERERS_BY_FORMAT[job.format]
+        return FileResponse(
+            job.file.open('rb'),
+            as_attachment=True,
+            filename=f'{SHOPPING_LIST_FILENAME}.{job.format}',
+            content_type=renderer.media_type
+        )
@@ -99,6 +99,9 @@ DATABASES = {
     # }
 }
 
+if DATABASES['default']['ENGINE'] == 'django.db.backends.postgresql':
+    INSTALLED_APPS.append('django.contrib.postgres')
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
@@ -144,6 +147,94 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'static')
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND',
+            default='django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.getenv('CACHE_LOCATION', default='foodgram'),
+    },
+    'responses': {
+        'BACKEND': os.getenv(
+            'RESPONSE_CACHE_BACKEND',
+            default='django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.getenv('RESPONSE_CACHE_LOCATION',
+                              default='foodgram-responses'),
+    },
+}
+
+RESPONSE_CACHE_ALIAS = 'responses'
+
+GENERATION_CACHE_TIMEOUT = int(
+    os.getenv('GENERATION_CACHE_TIMEOUT', default=5)
+)
+
+RESPONSE_CACHE_TIMEOUT = int(
+    os.getenv('RESPONSE_CACHE_TIMEOUT', default=60 * 5)
+)
+
+SHOPPING_LIST_CACHE_TIMEOUT = 60 * 60 * 24
+
+SHOPPING_LIST_JOB_TIMEOUT = int(
+    os.getenv('SHOPPING_LIST_JOB_TIMEOUT', default=60 * 10)
+)
+
+SHOPPING_LIST_JOB_RETENTION = int(
+    os.getenv('SHOPPING_LIST_JOB_RETENTION', default=60 * 60 * 24)
+)
+
+VIEWER_RELATIONS_CACHE_TIMEOUT = int(
+    os.getenv('VIEWER_RELATIONS_CACHE_TIMEOUT', default=0)
+)
+
+PAGINATION_COUNT_CACHE_TIMEOUT = int(
+    os.getenv('PAGINATION_COUNT_CACHE_TIMEOUT', default=0)
+)
+
+INGREDIENT_SEARCH_BACKEND = os.getenv('INGREDIENT_SEARCH_BACKEND',
+                                      default='memory')
+
+INGREDIENT_SEARCH_LIMIT = int(
+    os.getenv('INGREDIENT_SEARCH_LIMIT', default=50)
+)
+
+SHOPPING_LIST_PDF_FONT = os.getenv(
+    'SHOPPING_LIST_PDF_FONT',
+    default='/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf'
+)
+
+IMAGE_PIPELINE_WORKERS = int(
+    os.getenv('IMAGE_PIPELINE_WORKERS', default=2)
+)
+
+RECIPE_THUMBNAIL_SIZE = (480, 480)
+
+RECIPE_WEBP_QUALITY = 80
+
+RECIPE_IMAGE_MAX_SIZE = int(
+    os.getenv('RECIPE_IMAGE_MAX_SIZE', default=5 * 1024 * 1024)
+)
+
+RECIPE_IMAGE_MAX_PIXELS = int(
+    os.getenv('RECIPE_IMAGE_MAX_PIXELS', default=4096 * 4096)
+)
+
+RECIPE_UPLOAD_MAX_SIZE = RECIPE_IMAGE_MAX_SIZE * 4 // 3 + 1024 * 1024
+
+RECIPE_TRENDING_DAYS = int(
+    os.getenv('RECIPE_TRENDING_DAYS', default=7)
+)
+
+FEED_FANOUT_MAX_FOLLOWERS = int(
+    os.getenv('FEED_FANOUT_MAX_FOLLOWERS', default=1000)
+)
+
+FEED_BACKFILL_RECIPES = int(
+    os.getenv('FEED_BACKFILL_RECIPES', default=100)
+)
+
 
 REST_FRAMEWORK = {
 
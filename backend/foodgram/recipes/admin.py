@@ -1,7 +1,8 @@
 from django.contrib import admin
 
 from .models import (CustomUser, Favorite, Follow, Ingredient,
-                     IngredientRecipe, Recipe, ShoppingCart, Tag, TagRecipe)
+                     IngredientRecipe, Recipe, ShoppingCart, ShoppingListJob,
+                     Tag, TagRecipe)
 
 
 class MinValidatedInlineMixin:
@@ -14,7 +15,7 @@ class MinValidatedInlineMixin:
 
 
 class CustomUserAdmin(admin.ModelAdmin):
-    list_display = ('id', 'username', 'email')
+    list_display = ('id', 'username', 'email', 'recipes_count')
     list_filter = ('email', 'username')
 
 
@@ -44,7 +45,7 @@ class TagRecipeInline(admin.StackedInline):
 
 
 class RecipeAdmin(admin.ModelAdmin):
-    list_display = ('id', 'name', 'author')
+    list_display = ('id', 'name', 'author', 'favorites_count', 'cart_count')
     list_filter = ('author', 'name', 'tags')
     inlines = (TagRecipeInline, IngredientInline)
 
@@ -67,6 +68,12 @@ class TagRecipeAdmin(admin.ModelAdmin):
     list_display = ('id', 'tags', 'recipe')
 
 
+class ShoppingListJobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'user', 'format', 'status', 'created',
+                    'claimed_at')
+    list_filter = ('status', 'format')
+
+
 admin.site.register(CustomUser, CustomUserAdmin)
 admin.site.register(Tag, TagAdmin)
 admin.site.register(Recipe, RecipeAdmin)
@@ -76,3 +83,4 @@ admin.site.register(TagRecipe, TagRecipeAdmin)
 admin.site.register(IngredientRecipe, IngredientRecipeAdmin)
 admin.site.register(Favorite, FavoritesAdmin)
 admin.site.register(ShoppingCart, ShoppingCartAdmin)
+admin.site.register(ShoppingListJob, ShoppingListJobAdmin)
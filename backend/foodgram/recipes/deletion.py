@@ -0,0 +1,52 @@
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+
+from django.db import models, transaction
+from django.dispatch import Signal
+
+deletion_finished = Signal()
+
+_state = threading.local()
+
+
+class DeletionBatch:
+    def __init__(self):
+        self.deleted = defaultdict(set)
+        self.removed = defaultdict(list)
+
+
+def get_deletion_batch():
+    return getattr(_state, 'batch', None)
+
+
+def is_being_deleted(model, pk):
+    batch = get_deletion_batch()
+    return batch is not None and pk in batch.deleted[model]
+
+
+@contextmanager
+def deletion_batch():
+    if get_deletion_batch() is not None:
+        yield
+        return
+    batch = _state.batch = DeletionBatch()
+    try:
+        with transaction.atomic():
+            yield
+            _state.batch = None
+            deletion_finished.send(sender=DeletionBatch, batch=batch)
+    finally:
+        _state.batch = None
+
+
+class BatchDeleteQuerySet(models.QuerySet):
+    def delete(self):
+        with deletion_batch():
+            return super().delete()
+
+
+class BatchDeleteMixin:
+    def delete(self, *args, **kwargs):
+        with deletion_batch():
+            return super().delete(*args, **kwargs)
@@ -0,0 +1,95 @@
+from django.conf import settings
+from django.db.models import Exists, OuterRef, Q
+
+from .models import CustomUser, FeedEntry, Follow, Recipe
+
+FEED_BATCH_SIZE = 1000
+
+
+def before(position, date_field, id_field):
+    pub_date, pk = position
+    return (Q(**{f'{date_field}__lt': pub_date})
+            | Q(**{date_field: pub_date, f'{id_field}__lt': pk}))
+
+
+def fan_out_recipe(recipe):
+    followers = CustomUser.objects.filter(
+        id=recipe.author_id
+    ).values_list('followers_count', flat=True).first()
+    if followers is None or followers > settings.FEED_FANOUT_MAX_FOLLOWERS:
+        return 0
+    entries = [
+        FeedEntry(user_id=user_id, recipe_id=recipe.id,
+                  author_id=recipe.author_id, pub_date=recipe.pub_date)
+        for user_id in Follow.objects.filter(
+            author_id=recipe.author_id
+        ).values_list('user_id', flat=True)
+    ]
+    FeedEntry.objects.bulk_create(entries, batch_size=FEED_BATCH_SIZE,
+                                  ignore_conflicts=True)
+    return len(entries)
+
+
+def backfill_feed(user_id, author_ids):
+    authors = CustomUser.objects.filter(
+        id__in=author_ids,
+        followers_count__lte=settings.FEED_FANOUT_MAX_FOLLOWERS
+    ).values_list('id', flat=True)
+    entries = []
+    for author_id in authors:
+        entries += [
+            FeedEntry(user_id=user_id, recipe_id=recipe_id,
+                      author_id=author_id, pub_date=pub_date)
+            for recipe_id, pub_date in Recipe.objects.filter(
+                author_id=author_id
+            ).order_by('-pub_date', '-id').values_list(
+                'id', 'pub_date'
+            )[:settings.FEED_BACKFILL_RECIPES]
+        ]
+    FeedEntry.objects.bulk_create(entries, batch_size=FEED_BATCH_SIZE,
+                                  ignore_conflicts=True)
+    return len(entries)
+
+
+def clear_feed(user_id, author_id):
+    FeedEntry.objects.filter(user_id=user_id, author_id=author_id).delete()
+
+
+def prune_feeds():
+    deleted, _ = FeedEntry.objects.exclude(Exists(Follow.objects.filter(
+        user=OuterRef('user'), author=OuterRef('author')
+    ))).delete()
+    return deleted
+
+
+class FollowingFeed:
+    def __init__(self, user):
+        self.user = user
+
+    def get_read_authors(self):
+        return list(CustomUser.objects.filter(
+            following__user=self.user,
+            followers_count__gt=settings.FEED_FANOUT_MAX_FOLLOWERS
+        ).values_list('id', flat=True))
+
+    def get_page(self, queryset, position, limit):
+        entries = FeedEntry.objects.filter(user=self.user)
+        if position is not None:
+            entries = entries.filter(before(position, 'pub_date',
+                                            'recipe_id'))
+        keys = list(entries.order_by('-pub_date', '-recipe_id').values_list(
+            'pub_date', 'recipe_id'
+        )[:limit])
+        authors = self.get_read_authors()
+        if authors:
+            recipes = Recipe.objects.filter(author_id__in=authors)
+            if position is not None:
+                recipes = recipes.filter(before(position, 'pub_date', 'id'))
+            keys += recipes.order_by('-pub_date', '-id').values_list(
+                'pub_date', 'id'
+            )[:limit]
+        ids = [recipe_id
+               for _, recipe_id in sorted(set(keys), reverse=True)][:limit]
+        recipes = queryset.in_bulk(ids)
+        return [recipes[recipe_id] for recipe_id in ids
+                if recipe_id in recipes]
@@ -0,0 +1,117 @@
+import hashlib
+import io
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connection, transaction
+from django.utils import timezone
+from PIL import Image
+
+from .models import Recipe
+from .services import RECIPES, bump_generations
+
+ORIGINALS_PREFIX = 'recipes/images/sha256/'
+THUMBNAIL_PATH = 'recipes/thumbnails/{}.webp'
+WEBP_PATH = 'recipes/webp/{}.webp'
+READ_SIZE = 64 * 1024
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def is_processed(image_name):
+    return image_name.startswith(ORIGINALS_PREFIX)
+
+
+def hash_file(storage, name):
+    digest = hashlib.sha256()
+    with storage.open(name, 'rb') as file:
+        for chunk in iter(lambda: file.read(READ_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def open_image(storage, name):
+    with storage.open(name, 'rb') as file:
+        image = Image.open(file)
+        image.load()
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if 'A' in image.getbands() else 'RGB')
+    return image
+
+
+def save_variant(storage, name, image, size=None):
+    if storage.exists(name):
+        return name
+    if size:
+        image = image.copy()
+        image.thumbnail(size)
+    buffer = io.BytesIO()
+    image.save(buffer, 'WEBP', quality=settings.RECIPE_WEBP_QUALITY)
+    return storage.save(name, ContentFile(buffer.getvalue()))
+
+
+def process_recipe_image(recipe_id):
+    recipe = Recipe.objects.filter(pk=recipe_id).only('image').first()
+    if recipe is None or not recipe.image or is_processed(recipe.image.name):
+        return False
+    storage = recipe.image.storage
+    source = recipe.image.name
+    digest = hash_file(storage, source)
+    original = '{}{}{}'.format(ORIGINALS_PREFIX, digest,
+                               os.path.splitext(source)[1].lower())
+    image = open_image(storage, source)
+    thumbnail = save_variant(storage, THUMBNAIL_PATH.format(digest), image,
+                             settings.RECIPE_THUMBNAIL_SIZE)
+    webp = save_variant(storage, WEBP_PATH.format(digest), image)
+    if not storage.exists(original):
+        with storage.open(source, 'rb') as file:
+            original = storage.save(original, file)
+    updated = Recipe.objects.filter(pk=recipe_id, image=source).update(
+        image=original,
+        thumbnail=thumbnail,
+        image_webp=webp,
+        updated_at=timezone.now()
+    )
+    if not updated:
+        return False
+    if not Recipe.objects.filter(image=source).exists():
+        storage.delete(source)
+    bump_generations(RECIPES)
+    return True
+
+
+def run_image_task(recipe_id):
+    try:
+        process_recipe_image(recipe_id)
+    except Exception:
+        logger.exception('Не удалось обработать изображение рецепта %s',
+                         recipe_id)
+    finally:
+        connection.close()
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=settings.IMAGE_PIPELINE_WORKERS,
+                    thread_name_prefix='recipe-images'
+                )
+    return _executor
+
+
+def schedule_image_processing(recipe_id):
+    if not settings.IMAGE_PIPELINE_WORKERS:
+        return
+    transaction.on_commit(
+        lambda: get_executor().submit(run_image_task, recipe_id)
+    )
@@ -0,0 +1,32 @@
+from itertools import groupby
+
+from django.core.management.base import BaseCommand
+
+from recipes.feed import backfill_feed, prune_feeds
+from recipes.models import Follow
+
+
+class Command(BaseCommand):
+    help = ('Заполняет ленты подписок последними рецептами авторов и '
+            'удаляет записи об отменённых подписках.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int)
+        parser.add_argument('--author', type=int)
+
+    def handle(self, *args, **options):
+        follows = Follow.objects.order_by('user_id', 'author_id')
+        if options['user'] is not None:
+            follows = follows.filter(user_id=options['user'])
+        if options['author'] is not None:
+            follows = follows.filter(author_id=options['author'])
+        pruned = prune_feeds()
+        created = 0
+        pairs = follows.values_list('user_id', 'author_id').iterator()
+        for user_id, group in groupby(pairs, key=lambda pair: pair[0]):
+            created += backfill_feed(
+                user_id, [author_id for _, author_id in group]
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f'Обработано записей: {created}, удалено устаревших: {pruned}.'
+        ))
@@ -0,0 +1,38 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from recipes.models import Recipe
+from recipes.transfer import EXPORT_CHUNK_SIZE, export_recipes
+
+STDOUT = '-'
+
+
+class Command(BaseCommand):
+    help = 'Выгружает рецепты в NDJSON: одна строка на рецепт.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', default=STDOUT)
+        parser.add_argument('--author')
+        parser.add_argument('--no-images', action='store_true')
+        parser.add_argument('--chunk-size', type=int,
+                            default=EXPORT_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        queryset = Recipe.objects.all()
+        if options['author']:
+            queryset = queryset.filter(author__username=options['author'])
+        lines = export_recipes(queryset,
+                               include_images=not options['no_images'],
+                               chunk_size=options['chunk_size'])
+        if options['output'] == STDOUT:
+            sys.stdout.writelines(lines)
+            return
+        count = 0
+        with open(options['output'], 'w', encoding='utf-8') as file:
+            for line in lines:
+                file.write(line)
+                count += 1
+        self.stdout.write(self.style.SUCCESS(
+            f'Выгружено рецептов: {count}.'
+        ))
@@ -1,18 +1,90 @@
 import csv
+import json
+import os
+from itertools import islice
 
-from django.core.management.base import BaseCommand
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
 
 from recipes.models import Ingredient
+from recipes.search import invalidate_ingredients
+
+DEFAULT_PATH = os.path.join(settings.BASE_DIR, 'recipes', 'data',
+                            'ingredients.csv')
+FORMATS = ('csv', 'json')
+HEADER = ('name', 'measurement_unit')
+READ_SIZE = 64 * 1024
+
+
+def iter_csv(file):
+    for row in csv.reader(file):
+        if len(row) < 2 or tuple(row[:2]) == HEADER:
+            continue
+        yield row[0], row[1]
+
+
+def iter_json(file):
+    decoder = json.JSONDecoder()
+    buffer = file.read(READ_SIZE).lstrip()
+    if not buffer.startswith('['):
+        raise CommandError('Ожидается JSON-массив ингредиентов.')
+    buffer = buffer[1:]
+    while True:
+        buffer = buffer.lstrip().lstrip(',').lstrip()
+        if buffer.startswith(']'):
+            return
+        try:
+            item, end = decoder.raw_decode(buffer)
+        except json.JSONDecodeError:
+            chunk = file.read(READ_SIZE)
+            if not chunk:
+                raise CommandError('Некорректный JSON.')
+            buffer += chunk
+            continue
+        buffer = buffer[end:]
+        yield item['name'], item['measurement_unit']
 
 
 class Command(BaseCommand):
+    help = 'Загружает ингредиенты из CSV или JSON.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', default=DEFAULT_PATH)
+        parser.add_argument('--format', choices=FORMATS)
+        parser.add_argument('--batch-size', type=int, default=1000)
+
     def handle(self, *args, **options):
-        with open('recipes/data/ingredients.csv', encoding='utf-8') as file:
-            reader = csv.reader(file)
-            next(reader)
-            for row in reader:
-                ingredient = Ingredient(
-                    name=row[0],
-                    measurement_unit=row[1]
-                )
-                ingredient.save()
+        path = options['path']
+        file_format = (options['format']
+                       or os.path.splitext(path)[1].lstrip('.').lower())
+        if file_format not in FORMATS:
+            raise CommandError(
+                f'Не удалось определить формат файла {path}, '
+                f'укажите --format.'
+            )
+        reader = iter_csv if file_format == 'csv' else iter_json
+        batch_size = options['batch_size']
+        before = Ingredient.objects.count()
+        processed = 0
+        with open(path, encoding='utf-8', newline='') as file:
+            with transaction.atomic():
+                rows = reader(file)
+                while True:
+                    batch = [
+                        Ingredient(name=name.strip(),
+                                   measurement_unit=measurement_unit.strip())
+                        for name, measurement_unit in islice(rows,
+                                                             batch_size)
+                    ]
+                    if not batch:
+                        break
+                    Ingredient.objects.bulk_create(batch,
+                                                   ignore_conflicts=True)
+                    processed += len(batch)
+                    self.stdout.write(f'Обработано строк: {processed}')
+                transaction.on_commit(invalidate_ingredients)
+        created = Ingredient.objects.count() - before
+        self.stdout.write(self.style.SUCCESS(
+            f'Готово: {processed} строк, добавлено {created} ингредиентов.'
+        ))
@@ -0,0 +1,44 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from recipes.models import CustomUser
+from recipes.transfer import IMPORT_BATCH_SIZE, RecipeImporter
+
+STDIN = '-'
+
+
+class Command(BaseCommand):
+    help = ('Загружает рецепты из NDJSON, сопоставляя теги по slug, '
+            'ингредиенты по названию и единице измерения.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', default=STDIN)
+        parser.add_argument('--author',
+                            help='Автор для записей без известного автора.')
+        parser.add_argument('--batch-size', type=int,
+                            default=IMPORT_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        author = None
+        if options['author']:
+            try:
+                author = CustomUser.objects.get(username=options['author'])
+            except CustomUser.DoesNotExist:
+                raise CommandError(
+                    f'Пользователь {options["author"]} не найден.'
+                )
+        importer = RecipeImporter(author=author,
+                                  batch_size=options['batch_size'])
+        if options['path'] == STDIN:
+            importer.run(sys.stdin)
+        else:
+            with open(options['path'], encoding='utf-8') as file:
+                importer.run(file)
+        for number, message in importer.errors:
+            self.stderr.write(f'Строка {number}: {message}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Готово: добавлено {importer.created} рецептов, '
+            f'уже загружено {importer.skipped}, '
+            f'пропущено {importer.failed}.'
+        ))
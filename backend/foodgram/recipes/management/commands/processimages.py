@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+
+from recipes.images import ORIGINALS_PREFIX, process_recipe_image
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = ('Создаёт миниатюры и WebP-версии изображений рецептов и '
+            'объединяет одинаковые файлы.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        pending = Recipe.objects.exclude(
+            image__startswith=ORIGINALS_PREFIX
+        ).exclude(image='').order_by('id').values_list('id', flat=True)
+        processed = failed = 0
+        last_id = 0
+        while True:
+            chunk = list(pending.filter(id__gt=last_id)[
+                :options['chunk_size']])
+            if not chunk:
+                break
+            for recipe_id in chunk:
+                try:
+                    processed += process_recipe_image(recipe_id)
+                except (OSError, ValueError) as error:
+                    failed += 1
+                    self.stderr.write(f'Рецепт {recipe_id}: {error}')
+            last_id = chunk[-1]
+        self.stdout.write(self.style.SUCCESS(
+            f'Обработано изображений: {processed}, с ошибками: {failed}.'
+        ))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from recipes.services import rebuild_counters
+
+
+class Command(BaseCommand):
+    help = ('Пересчитывает счётчики избранного, списков покупок и '
+            'рецептов авторов.')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            recipes, users = rebuild_counters()
+        self.stdout.write(self.style.SUCCESS(
+            f'Пересчитано рецептов: {recipes}, пользователей: {users}.'
+        ))
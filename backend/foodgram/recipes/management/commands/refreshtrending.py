@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from recipes.trending import refresh_trending
+
+
+class Command(BaseCommand):
+    help = ('Пересчитывает популярность рецептов за последние дни и удаляет '
+            'устаревшую активность.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true')
+
+    def handle(self, *args, **options):
+        updated, removed = refresh_trending(full=options['full'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Обновлено рецептов: {updated}, удалено записей активности: '
+            f'{removed}.'
+        ))
@@ -0,0 +1,40 @@
+# Generated by Django 3.2 on 2026-10-18 04:50
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0003_auto_20221110_1510'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ShoppingListJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('format', models.CharField(max_length=10)),
+                ('status', models.CharField(choices=[('pending', 'В очереди'), ('processing', 'Выполняется'), ('done', 'Готово'), ('failed', 'Ошибка')], default='pending', max_length=15)),
+                ('cart_version', models.CharField(max_length=32)),
+                ('file', models.FileField(blank=True, upload_to='shopping_lists/')),
+                ('error', models.TextField(blank=True)),
+                ('created', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name_plural': 'Задания на список покупок',
+                'ordering': ('created',),
+            },
+        ),
+        migrations.AddField(
+            model_name='shoppinglistjob',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='shopping_list_jobs', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='shoppinglistjob',
+            index=models.Index(fields=['status', 'created'], name='shopping_list_job_queue_idx'),
+        ),
+    ]
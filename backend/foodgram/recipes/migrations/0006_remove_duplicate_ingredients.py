@@ -0,0 +1,37 @@
+from django.db import migrations
+from django.db.models import Count, Min
+
+
+def remove_duplicate_ingredients(apps, schema_editor):
+    Ingredient = apps.get_model('recipes', 'Ingredient')
+    IngredientRecipe = apps.get_model('recipes', 'IngredientRecipe')
+    duplicates = Ingredient.objects.values(
+        'name', 'measurement_unit'
+    ).annotate(keep_id=Min('id'), count=Count('id')).filter(count__gt=1)
+    for group in duplicates:
+        keep_id = group['keep_id']
+        extra = Ingredient.objects.filter(
+            name=group['name'],
+            measurement_unit=group['measurement_unit']
+        ).exclude(id=keep_id)
+        for link in IngredientRecipe.objects.filter(ingredient__in=extra):
+            if IngredientRecipe.objects.filter(
+                    recipe_id=link.recipe_id,
+                    ingredient_id=keep_id).exists():
+                link.delete()
+            else:
+                link.ingredient_id = keep_id
+                link.save(update_fields=['ingredient'])
+        extra.delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0005_ingredient_name_trgm'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_ingredients,
+                             migrations.RunPython.noop),
+    ]
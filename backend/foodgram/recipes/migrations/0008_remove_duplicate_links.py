@@ -0,0 +1,29 @@
+from django.db import migrations
+from django.db.models import Min
+
+UNIQUE_FIELDS = (
+    ('ShoppingCart', ('user', 'recipe')),
+    ('TagRecipe', ('tags', 'recipe')),
+    ('IngredientRecipe', ('recipe', 'ingredient')),
+)
+
+
+def remove_duplicate_links(apps, schema_editor):
+    for model_name, fields in UNIQUE_FIELDS:
+        model = apps.get_model('recipes', model_name)
+        keep_ids = list(model.objects.values(*fields).annotate(
+            keep_id=Min('id')
+        ).values_list('keep_id', flat=True))
+        model.objects.exclude(id__in=keep_ids).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0007_ingredient_unique'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_links,
+                             migrations.RunPython.noop),
+    ]
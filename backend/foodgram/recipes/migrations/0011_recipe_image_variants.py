@@ -0,0 +1,26 @@
+# Generated by Django 3.2 on 2026-10-18 05:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0010_recipe_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='image_webp',
+            field=models.ImageField(blank=True, upload_to='recipes/webp/',
+                                    verbose_name='Изображение WebP'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='thumbnail',
+            field=models.ImageField(blank=True,
+                                    upload_to='recipes/thumbnails/',
+                                    verbose_name='Миниатюра'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 3.2 on 2026-10-18 05:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0014_feed'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CacheGeneration',
+            fields=[
+                ('name', models.CharField(max_length=64, primary_key=True, serialize=False, verbose_name='Название')),
+                ('value', models.CharField(max_length=32, verbose_name='Версия')),
+            ],
+            options={
+                'verbose_name_plural': 'Версии кэша',
+            },
+        ),
+    ]
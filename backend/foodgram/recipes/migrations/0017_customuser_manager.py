@@ -0,0 +1,20 @@
+# Generated by Django 3.2 on 2026-10-18 05:59
+
+from django.db import migrations
+import recipes.models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0016_shoppinglistjob_claimed_at'),
+    ]
+
+    operations = [
+        migrations.AlterModelManagers(
+            name='customuser',
+            managers=[
+                ('objects', recipes.models.CustomUserManager()),
+            ],
+        ),
+    ]
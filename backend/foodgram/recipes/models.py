@@ -1,13 +1,25 @@
-from django.contrib.auth.models import AbstractUser
+from django.contrib.auth.models import AbstractUser, UserManager
 from django.core.validators import MinValueValidator
 from django.db import models
+from django.db.models import BooleanField, Exists, OuterRef, Prefetch, Value
 from django.utils.translation import gettext_lazy as _
 
+from .deletion import BatchDeleteMixin, BatchDeleteQuerySet
+
 ADMIN = 'admin'
 USER = 'user'
 
+PENDING = 'pending'
+PROCESSING = 'processing'
+DONE = 'done'
+FAILED = 'failed'
+
+
+class CustomUserManager(UserManager.from_queryset(BatchDeleteQuerySet)):
+    pass
+
 
-class CustomUser(AbstractUser):
+class CustomUser(BatchDeleteMixin, AbstractUser):
     USER_ROLES = (
         (ADMIN, _('Administrator')),
         (USER, _('User')),
@@ -20,6 +32,12 @@ class CustomUser(AbstractUser):
         max_length=15,
         choices=USER_ROLES,
         default=USER,)
+    recipes_count = models.PositiveIntegerField('Количество рецептов',
+                                                default=0, editable=False)
+    followers_count = models.PositiveIntegerField('Количество подписчиков',
+                                                  default=0, editable=False)
+
+    objects = CustomUserManager()
 
     class Meta:
         verbose_name_plural = 'Пользователи'
@@ -79,12 +97,44 @@ class Ingredient(models.Model):
 
     class Meta:
         verbose_name_plural = 'Ингредиенты'
+        constraints = [
+            models.UniqueConstraint(fields=['name', 'measurement_unit'],
+                                    name='unique_ingredient_object'),
+        ]
 
     def __str__(self):
         return self.name
 
 
-class Recipe(models.Model):
+class RecipeQuerySet(BatchDeleteQuerySet):
+    def with_related(self):
+        return self.select_related('author').prefetch_related(
+            Prefetch(
+                'tagrecipe_set',
+                queryset=TagRecipe.objects.only('recipe', 'tags'),
+                to_attr='tag_links'
+            ),
+            Prefetch(
+                'ingredient_recipes',
+                queryset=IngredientRecipe.objects.select_related('ingredient')
+            )
+        )
+
+    def with_user_flags(self, user):
+        if not user.is_authenticated:
+            return self.annotate(
+                is_favorited=Value(False, output_field=BooleanField()),
+                is_in_shopping_cart=Value(False, output_field=BooleanField())
+            )
+        return self.annotate(
+            is_favorited=Exists(Favorite.objects.filter(
+                user=user, recipe=OuterRef('pk'))),
+            is_in_shopping_cart=Exists(ShoppingCart.objects.filter(
+                user=user, recipe=OuterRef('pk')))
+        )
+
+
+class Recipe(BatchDeleteMixin, models.Model):
     tags = models.ManyToManyField(Tag,
                                   through='TagRecipe',
                                   )
@@ -98,14 +148,37 @@ class Recipe(models.Model):
                                          )
     name = models.CharField(max_length=200)
     image = models.ImageField(upload_to='recipes/images/%Y/%m/%d/')
+    thumbnail = models.ImageField('Миниатюра', upload_to='recipes/thumbnails/',
+                                  blank=True)
+    image_webp = models.ImageField('Изображение WebP',
+                                   upload_to='recipes/webp/', blank=True)
     text = models.TextField()
     cooking_time = models.PositiveSmallIntegerField(
         validators=[MinValueValidator(1)])
     pub_date = models.DateTimeField('Дата публикации', auto_now_add=True)
+    updated_at = models.DateTimeField('Дата изменения', auto_now=True)
+    favorites_count = models.PositiveIntegerField('В избранном', default=0,
+                                                  editable=False)
+    cart_count = models.PositiveIntegerField('В списках покупок', default=0,
+                                             editable=False)
+    trending_score = models.PositiveIntegerField('Популярность за период',
+                                                 default=0, editable=False)
+
+    objects = RecipeQuerySet.as_manager()
 
     class Meta:
         verbose_name_plural = 'Рецепты'
         ordering = ('-pub_date',)
+        indexes = [
+            models.Index(fields=['-pub_date', '-id'],
+                         name='recipe_pub_date_idx'),
+            models.Index(fields=['author', '-pub_date'],
+                         name='recipe_author_pub_date_idx'),
+            models.Index(fields=['-favorites_count', '-id'],
+                         name='recipe_popular_idx'),
+            models.Index(fields=['-trending_score', '-id'],
+                         name='recipe_trending_idx'),
+        ]
 
     def __str__(self):
         return self.name
@@ -120,6 +193,10 @@ class TagRecipe(models.Model):
 
     class Meta:
         verbose_name_plural = 'Тег с рецептом'
+        constraints = [
+            models.UniqueConstraint(fields=['tags', 'recipe'],
+                                    name='unique_tag_recipe_object'),
+        ]
 
 
 class IngredientRecipe(models.Model):
@@ -176,3 +253,98 @@ class ShoppingCart(models.Model):
 
     class Meta:
         verbose_name_plural = 'Корзина'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'recipe'],
+                                    name='unique_shopping_cart_object'),
+        ]
+
+
+class RecipeActivity(models.Model):
+    recipe = models.ForeignKey(Recipe,
+                               on_delete=models.CASCADE,
+                               related_name='activity')
+    day = models.DateField('День')
+    score = models.IntegerField('Активность', default=0)
+
+    class Meta:
+        verbose_name_plural = 'Активность рецептов'
+        constraints = [
+            models.UniqueConstraint(fields=['recipe', 'day'],
+                                    name='unique_recipe_activity_day'),
+        ]
+
+    def __str__(self):
+        return f'{self.recipe} {self.day}'
+
+
+class FeedEntry(models.Model):
+    user = models.ForeignKey(CustomUser,
+                             on_delete=models.CASCADE,
+                             related_name='feed_entries')
+    recipe = models.ForeignKey(Recipe,
+                               on_delete=models.CASCADE,
+                               related_name='feed_entries')
+    author = models.ForeignKey(CustomUser,
+                               on_delete=models.CASCADE,
+                               related_name='+')
+    pub_date = models.DateTimeField('Дата публикации')
+
+    class Meta:
+        verbose_name_plural = 'Ленты подписок'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'recipe'],
+                                    name='unique_feed_entry'),
+        ]
+        indexes = [
+            models.Index(fields=['user', '-pub_date', '-recipe'],
+                         name='feed_entry_user_pub_date_idx'),
+            models.Index(fields=['user', 'author'],
+                         name='feed_entry_user_author_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.user} {self.recipe}'
+
+
+class ShoppingListJob(models.Model):
+    JOB_STATUSES = (
+        (PENDING, 'В очереди'),
+        (PROCESSING, 'Выполняется'),
+        (DONE, 'Готово'),
+        (FAILED, 'Ошибка'),
+    )
+    user = models.ForeignKey(CustomUser,
+                             on_delete=models.CASCADE,
+                             related_name='shopping_list_jobs'
+                             )
+    format = models.CharField(max_length=10)
+    status = models.CharField(max_length=15,
+                              choices=JOB_STATUSES,
+                              default=PENDING)
+    cart_version = models.CharField(max_length=32)
+    file = models.FileField(upload_to='shopping_lists/', blank=True)
+    error = models.TextField(blank=True)
+    created = models.DateTimeField(auto_now_add=True)
+    claimed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name_plural = 'Задания на список покупок'
+        ordering = ('created',)
+        indexes = [
+            models.Index(fields=['status', 'created'],
+                         name='shopping_list_job_queue_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.user} {self.format} {self.status}'
+
+
+class CacheGeneration(models.Model):
+    name = models.CharField('Название', max_length=64, primary_key=True)
+    value = models.CharField('Версия', max_length=32)
+
+    class Meta:
+        verbose_name_plural = 'Версии кэша'
+
+    def __str__(self):
+        return f'{self.name} {self.value}'
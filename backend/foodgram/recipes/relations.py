@@ -0,0 +1,238 @@
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+
+from .models import CustomUser, Favorite, Follow, Recipe, ShoppingCart
+from .services import (SCORES, bump_generations, cart_generation,
+                       change_counters, viewer_generation)
+from .trending import record_activity
+
+FOLLOWED_AUTHORS = 'followed_authors'
+FAVORITE_RECIPES = 'favorite_recipes'
+CART_RECIPES = 'cart_recipes'
+RELATIONS_CACHE_KEY = 'viewer_relations:{kind}:{user_id}'
+
+RELATION_QUERIES = {
+    FOLLOWED_AUTHORS: lambda user_id: Follow.objects.filter(
+        user_id=user_id).values_list('author_id', flat=True),
+    FAVORITE_RECIPES: lambda user_id: Favorite.objects.filter(
+        user_id=user_id).values_list('recipe_id', flat=True),
+    CART_RECIPES: lambda user_id: ShoppingCart.objects.filter(
+        user_id=user_id).values_list('recipe_id', flat=True),
+}
+RELATION_MODELS = {
+    FOLLOWED_AUTHORS: (Follow, 'author'),
+    FAVORITE_RECIPES: (Favorite, 'recipe'),
+    CART_RECIPES: (ShoppingCart, 'recipe'),
+}
+RELATION_KINDS = {model: kind for kind, (model, _) in RELATION_MODELS.items()}
+RELATION_COUNTERS = {
+    FOLLOWED_AUTHORS: (CustomUser, 'followers_count'),
+    FAVORITE_RECIPES: (Recipe, 'favorites_count'),
+    CART_RECIPES: (Recipe, 'cart_count'),
+}
+ADDED = 'added'
+ALREADY_ADDED = 'exists'
+REMOVED = 'removed'
+NOT_ADDED = 'absent'
+NOT_FOUND = 'not_found'
+INSERT_RELATIONS_SQL = ('{insert} {table} ({user}, {target}) '
+                        'VALUES {values} {suffix} RETURNING {target}')
+DELETE_RELATIONS_SQL = ('DELETE FROM {table} WHERE {user} = %s '
+                        'AND {target} IN ({targets}) RETURNING {target}')
+
+
+def load_relation(kind, user_id):
+    timeout = settings.VIEWER_RELATIONS_CACHE_TIMEOUT
+    key = RELATIONS_CACHE_KEY.format(kind=kind, user_id=user_id)
+    if timeout:
+        ids = cache.get(key)
+        if ids is not None:
+            return ids
+    ids = frozenset(RELATION_QUERIES[kind](user_id))
+    if timeout:
+        cache.set(key, ids, timeout)
+    return ids
+
+
+def invalidate_relation(kind, user_ids):
+    if settings.VIEWER_RELATIONS_CACHE_TIMEOUT:
+        keys = [RELATIONS_CACHE_KEY.format(kind=kind, user_id=user_id)
+                for user_id in user_ids]
+        cache.delete_many(keys)
+        transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def relation_generations(kind, user_ids):
+    generations = []
+    if kind == CART_RECIPES:
+        generations += map(cart_generation, user_ids)
+    if kind != FOLLOWED_AUTHORS:
+        generations += map(viewer_generation, user_ids)
+    return generations
+
+
+def relation_changed(kind, user_ids):
+    invalidate_relation(kind, user_ids)
+    bump_generations(*relation_generations(kind, user_ids))
+
+
+def get_relation_target_id(instance):
+    _, target = RELATION_MODELS[RELATION_KINDS[type(instance)]]
+    return getattr(instance, f'{target}_id')
+
+
+def change_relation_counters(kind, target_ids, delta, trending=False):
+    model, field = RELATION_COUNTERS[kind]
+    fields = [field]
+    if model is Recipe and trending:
+        fields.append('trending_score')
+        record_activity(target_ids, delta)
+    change_counters(model, fields, target_ids, delta)
+    if model is Recipe:
+        transaction.on_commit(lambda: bump_generations(SCORES))
+
+
+def change_relation_counts(kind, target_ids, delta):
+    grouped = {}
+    for target_id, count in Counter(target_ids).items():
+        grouped.setdefault(count, []).append(target_id)
+    for count, ids in grouped.items():
+        change_relation_counters(kind, ids, count * delta)
+
+
+def relations_removed(kind, instances, deleted):
+    target_model, _ = RELATION_COUNTERS[kind]
+    change_relation_counts(kind, [
+        target_id for target_id in map(get_relation_target_id, instances)
+        if target_id not in deleted.get(target_model, ())
+    ], -1)
+    user_ids = {instance.user_id for instance in instances
+                if instance.user_id not in deleted.get(CustomUser, ())}
+    invalidate_relation(kind, user_ids)
+    return relation_generations(kind, user_ids)
+
+
+def insert_relations(kind, user_id, target_ids):
+    if not target_ids:
+        return set()
+    model, target = RELATION_MODELS[kind]
+    opts = model._meta
+    quote_name = connection.ops.quote_name
+    sql = INSERT_RELATIONS_SQL.format(
+        insert=connection.ops.insert_statement(ignore_conflicts=True),
+        table=quote_name(opts.db_table),
+        user=quote_name(opts.get_field('user').column),
+        target=quote_name(opts.get_field(target).column),
+        values=', '.join(['(%s, %s)'] * len(target_ids)),
+        suffix=connection.ops.ignore_conflicts_suffix_sql(
+            ignore_conflicts=True
+        )
+    )
+    params = []
+    for target_id in target_ids:
+        params += [user_id, target_id]
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return {target_id for target_id, in cursor.fetchall()}
+
+
+def delete_relations(kind, user_id, target_ids):
+    if not target_ids:
+        return set()
+    model, target = RELATION_MODELS[kind]
+    opts = model._meta
+    quote_name = connection.ops.quote_name
+    sql = DELETE_RELATIONS_SQL.format(
+        table=quote_name(opts.db_table),
+        user=quote_name(opts.get_field('user').column),
+        target=quote_name(opts.get_field(target).column),
+        targets=', '.join(['%s'] * len(target_ids))
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [user_id, *target_ids])
+        return {target_id for target_id, in cursor.fetchall()}
+
+
+@transaction.atomic
+def add_relation(kind, user_id, target_id):
+    created = insert_relations(kind, user_id, [target_id])
+    if created:
+        change_relation_counters(kind, [target_id], 1, trending=True)
+        relation_changed(kind, [user_id])
+    return bool(created)
+
+
+@transaction.atomic
+def remove_relation(kind, user_id, target_id):
+    deleted = delete_relations(kind, user_id, [target_id])
+    if deleted:
+        change_relation_counters(kind, [target_id], -1, trending=True)
+        relation_changed(kind, [user_id])
+    return bool(deleted)
+
+
+@transaction.atomic
+def apply_relations(kind, user_id, add_ids=(), remove_ids=()):
+    model, target = RELATION_MODELS[kind]
+    target_model = model._meta.get_field(target).related_model
+    existing = set(target_model.objects.filter(
+        id__in=set(add_ids).union(remove_ids)
+    ).values_list('id', flat=True))
+    added = insert_relations(kind, user_id,
+                             sorted(existing.intersection(add_ids)))
+    removed = delete_relations(kind, user_id,
+                               sorted(existing.intersection(remove_ids)))
+    results = {}
+    for target_id in add_ids:
+        if target_id not in existing:
+            results[target_id] = NOT_FOUND
+        else:
+            results[target_id] = ADDED if target_id in added else ALREADY_ADDED
+    for target_id in remove_ids:
+        if target_id not in existing:
+            results[target_id] = NOT_FOUND
+        else:
+            results[target_id] = REMOVED if target_id in removed else NOT_ADDED
+    if added:
+        change_relation_counters(kind, sorted(added), 1, trending=True)
+    if removed:
+        change_relation_counters(kind, sorted(removed), -1, trending=True)
+    if added or removed:
+        relation_changed(kind, [user_id])
+    return results
+
+
+class ViewerRelations:
+    def __init__(self, user):
+        self.user = user
+        self._relations = {}
+
+    def _get(self, kind):
+        if kind not in self._relations:
+            if self.user.is_authenticated:
+                self._relations[kind] = load_relation(kind, self.user.id)
+            else:
+                self._relations[kind] = frozenset()
+        return self._relations[kind]
+
+    def is_following(self, author_id):
+        return author_id in self._get(FOLLOWED_AUTHORS)
+
+    def is_favorited(self, recipe_id):
+        return recipe_id in self._get(FAVORITE_RECIPES)
+
+    def is_in_shopping_cart(self, recipe_id):
+        return recipe_id in self._get(CART_RECIPES)
+
+
+def get_viewer_relations(request):
+    http_request = getattr(request, '_request', request)
+    relations = getattr(http_request, 'viewer_relations', None)
+    if relations is None:
+        relations = http_request.viewer_relations = ViewerRelations(
+            request.user
+        )
+    return relations
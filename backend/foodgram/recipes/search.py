@@ -0,0 +1,179 @@
+import bisect
+import re
+import threading
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.contrib.postgres.search import TrigramSimilarity
+from django.db import connection
+from django.db.models import Case, IntegerField, Q, When
+
+from .models import Ingredient
+from .services import INGREDIENTS, bump_generations, get_generation
+
+MAX_CHAR = '\U0010ffff'
+NGRAM_SIZE = 3
+SIMILARITY_THRESHOLD = 0.3
+WORD_SPLIT_RE = re.compile(r'[^\w]+')
+
+
+def invalidate_ingredients():
+    bump_generations(INGREDIENTS)
+
+
+def ngrams(text):
+    return {text[i:i + NGRAM_SIZE]
+            for i in range(len(text) - NGRAM_SIZE + 1)}
+
+
+def word_trigrams(text):
+    trigrams = set()
+    for word in WORD_SPLIT_RE.split(text):
+        if word:
+            trigrams |= ngrams(f'  {word} ')
+    return trigrams
+
+
+def similarity(first, second):
+    if not first or not second:
+        return 0
+    shared = len(first & second)
+    return shared / (len(first) + len(second) - shared)
+
+
+class IngredientIndexData:
+    def __init__(self, version, ingredients):
+        self.version = version
+        self.ingredients = sorted(
+            ingredients, key=lambda item: (item.name.lower(), item.id)
+        )
+        self.keys = [item.name.lower() for item in self.ingredients]
+        self.substring_postings = defaultdict(set)
+        self.trigram_postings = defaultdict(set)
+        self.word_trigrams = []
+        self.name_trigrams = []
+        for position, key in enumerate(self.keys):
+            for gram in ngrams(key):
+                self.substring_postings[gram].add(position)
+            words = [word_trigrams(word)
+                     for word in WORD_SPLIT_RE.split(key) if word]
+            self.word_trigrams.append(words)
+            self.name_trigrams.append(set().union(*words))
+            for gram in self.name_trigrams[position]:
+                self.trigram_postings[gram].add(position)
+
+
+class IngredientIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._data = IngredientIndexData(None, [])
+
+    def _get_data(self):
+        version = get_generation(INGREDIENTS)
+        data = self._data
+        if data.version != version:
+            with self._lock:
+                data = self._data
+                if data.version != version:
+                    data = self._data = IngredientIndexData(
+                        version, Ingredient.objects.all()
+                    )
+        return data
+
+    def _prefix_range(self, data, query):
+        start = bisect.bisect_left(data.keys, query)
+        end = bisect.bisect_left(data.keys, query + MAX_CHAR, lo=start)
+        return range(start, end)
+
+    def _substring_positions(self, data, query):
+        grams = ngrams(query)
+        if grams:
+            candidates = set.intersection(*(
+                data.substring_postings.get(gram, set()) for gram in grams
+            ))
+        else:
+            candidates = range(len(data.keys))
+        positions = [position for position in candidates
+                     if query in data.keys[position]]
+        return sorted(positions, key=lambda position: (
+            data.keys[position].index(query),
+            len(data.keys[position]),
+            data.keys[position],
+        ))
+
+    def _fuzzy_positions(self, data, query):
+        query_trigrams = word_trigrams(query)
+        candidates = Counter()
+        for gram in query_trigrams:
+            for position in data.trigram_postings.get(gram, ()):
+                candidates[position] += 1
+        min_shared = SIMILARITY_THRESHOLD * len(query_trigrams)
+        scored = []
+        for position, shared in candidates.items():
+            if shared < min_shared:
+                continue
+            name_score = similarity(query_trigrams,
+                                    data.name_trigrams[position])
+            score = max(
+                [name_score]
+                + [similarity(query_trigrams, trigrams)
+                   for trigrams in data.word_trigrams[position]]
+            )
+            if score >= SIMILARITY_THRESHOLD:
+                scored.append(
+                    (-score, -name_score, data.keys[position], position)
+                )
+        return [item[-1] for item in sorted(scored)]
+
+    def prefix(self, query, limit=None):
+        data = self._get_data()
+        positions = self._prefix_range(data, query.strip().lower())
+        if limit:
+            positions = positions[:limit]
+        return [data.ingredients[position] for position in positions]
+
+    def search(self, query, limit=None):
+        data = self._get_data()
+        query = query.strip().lower()
+        if not query:
+            return []
+        tiers = (
+            lambda: self._prefix_range(data, query),
+            lambda: self._substring_positions(data, query),
+            lambda: self._fuzzy_positions(data, query),
+        )
+        result = {}
+        for tier in tiers:
+            for position in tier():
+                result.setdefault(position, data.ingredients[position])
+                if limit and len(result) >= limit:
+                    return list(result.values())
+        return list(result.values())
+
+
+def database_search(query, limit=None):
+    query = query.strip()
+    queryset = Ingredient.objects.annotate(
+        rank=Case(
+            When(name__istartswith=query, then=0),
+            When(name__icontains=query, then=1),
+            default=2,
+            output_field=IntegerField(),
+        ),
+        similarity=TrigramSimilarity('name', query),
+    ).filter(
+        Q(name__icontains=query) | Q(name__trigram_similar=query)
+    ).order_by('rank', '-similarity', 'name')
+    if limit:
+        queryset = queryset[:limit]
+    return list(queryset)
+
+
+ingredient_index = IngredientIndex()
+
+
+def search_ingredients(query, limit=None):
+    if (settings.INGREDIENT_SEARCH_BACKEND == 'database'
+            and connection.vendor == 'postgresql'):
+        return database_search(query, limit)
+    return ingredient_index.search(query, limit)
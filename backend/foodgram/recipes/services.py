@@ -0,0 +1,184 @@
+import hashlib
+import uuid
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import Count, F, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+
+from .models import (CacheGeneration, CustomUser, Favorite, Follow,
+                     IngredientRecipe, Recipe, ShoppingCart)
+
+GENERATION_KEY = 'generation:{}'
+RECIPES = 'recipes'
+TAGS = 'tags'
+INGREDIENTS = 'ingredients'
+USERS = 'users'
+SCORES = 'scores'
+VIEWER = 'viewer:{}'
+CART = 'cart:{}'
+BUMP_GENERATIONS_SQL = (
+    'INSERT INTO {table} ({name}, {value}) VALUES {values} '
+    'ON CONFLICT ({name}) DO UPDATE SET {value} = EXCLUDED.{value}'
+)
+DELETE_RECIPE_INGREDIENTS_SQL = ('DELETE FROM {table} WHERE {recipe} = %s '
+                                 'AND {ingredient} IN ({ingredients})')
+
+
+def get_shopping_list(user):
+    return (
+        IngredientRecipe.objects
+        .filter(recipe__shop__user=user)
+        .values(name=F('ingredient__name'),
+                measurement_unit=F('ingredient__measurement_unit'))
+        .annotate(total_amount=Sum('amount'))
+        .order_by('name', 'measurement_unit')
+    )
+
+
+def delete_recipe_ingredients(recipe_id, ingredient_ids):
+    opts = IngredientRecipe._meta
+    quote_name = connection.ops.quote_name
+    sql = DELETE_RECIPE_INGREDIENTS_SQL.format(
+        table=quote_name(opts.db_table),
+        recipe=quote_name(opts.get_field('recipe').column),
+        ingredient=quote_name(opts.get_field('ingredient').column),
+        ingredients=', '.join(['%s'] * len(ingredient_ids))
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [recipe_id, *ingredient_ids])
+
+
+def set_recipe_ingredients(recipe, amounts):
+    current = {link.ingredient_id: link
+               for link in IngredientRecipe.objects.filter(recipe=recipe)}
+    removed = [ingredient_id for ingredient_id in current
+               if ingredient_id not in amounts]
+    if removed:
+        delete_recipe_ingredients(recipe.id, removed)
+    changed = []
+    for ingredient_id, link in current.items():
+        amount = amounts.get(ingredient_id)
+        if amount is not None and link.amount != amount:
+            link.amount = amount
+            changed.append(link)
+    if changed:
+        IngredientRecipe.objects.bulk_update(changed, ['amount'])
+    IngredientRecipe.objects.bulk_create([
+        IngredientRecipe(recipe=recipe, ingredient_id=ingredient_id,
+                         amount=amount)
+        for ingredient_id, amount in amounts.items()
+        if ingredient_id not in current
+    ])
+    touch_recipes([recipe.id])
+    invalidate_recipe_carts([recipe.id])
+    bump_generations(RECIPES)
+
+
+def touch_recipes(recipe_ids):
+    Recipe.objects.filter(id__in=recipe_ids).update(updated_at=timezone.now())
+
+
+def change_counters(model, fields, ids, delta):
+    model.objects.filter(id__in=ids).update(
+        **{field: Greatest(F(field) + delta, 0) for field in fields}
+    )
+
+
+def change_recipe_counts(author_ids, delta=1):
+    grouped = {}
+    for author_id, count in Counter(author_ids).items():
+        grouped.setdefault(count, []).append(author_id)
+    for count, ids in grouped.items():
+        change_counters(CustomUser, ['recipes_count'], ids, count * delta)
+
+
+def count_related(model, field):
+    return Coalesce(Subquery(
+        model.objects.filter(
+            **{field: OuterRef('pk')}
+        ).order_by().values(field).annotate(total=Count('id')).values('total')
+    ), 0)
+
+
+def rebuild_counters():
+    recipes = Recipe.objects.update(
+        favorites_count=count_related(Favorite, 'recipe'),
+        cart_count=count_related(ShoppingCart, 'recipe')
+    )
+    users = CustomUser.objects.update(
+        recipes_count=count_related(Recipe, 'author'),
+        followers_count=count_related(Follow, 'author')
+    )
+    return recipes, users
+
+
+def get_cart_version(user_id):
+    generations = get_generations([cart_generation(user_id), INGREDIENTS])
+    return hashlib.md5(':'.join(generations).encode()).hexdigest()
+
+
+def invalidate_cart_versions(user_ids):
+    bump_generations(*map(cart_generation, user_ids))
+
+
+def invalidate_recipe_carts(recipe_ids):
+    invalidate_cart_versions(set(
+        ShoppingCart.objects.filter(
+            recipe_id__in=recipe_ids
+        ).values_list('user_id', flat=True)
+    ))
+
+
+def get_generations(names):
+    keys = [GENERATION_KEY.format(name) for name in names]
+    generations = cache.get_many(keys)
+    missing = [name for name, key in zip(names, keys)
+               if key not in generations]
+    if missing:
+        stored = dict(CacheGeneration.objects.filter(
+            name__in=missing
+        ).values_list('name', 'value'))
+        loaded = {GENERATION_KEY.format(name): stored.get(name, '')
+                  for name in missing}
+        if settings.GENERATION_CACHE_TIMEOUT:
+            cache.set_many(loaded, settings.GENERATION_CACHE_TIMEOUT)
+        generations.update(loaded)
+    return [generations[key] for key in keys]
+
+
+def get_generation(name):
+    return get_generations([name])[0]
+
+
+def viewer_generation(user_id):
+    return VIEWER.format(user_id)
+
+
+def cart_generation(user_id):
+    return CART.format(user_id)
+
+
+def bump_generations(*names):
+    names = sorted(set(names))
+    if not names:
+        return
+    opts = CacheGeneration._meta
+    quote_name = connection.ops.quote_name
+    sql = BUMP_GENERATIONS_SQL.format(
+        table=quote_name(opts.db_table),
+        name=quote_name(opts.get_field('name').column),
+        value=quote_name(opts.get_field('value').column),
+        values=', '.join(['(%s, %s)'] * len(names))
+    )
+    params = []
+    for name in names:
+        params += [name, uuid.uuid4().hex]
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+    keys = [GENERATION_KEY.format(name) for name in names]
+    cache.delete_many(keys)
+    transaction.on_commit(lambda: cache.delete_many(keys))
@@ -0,0 +1,150 @@
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_delete)
+from django.dispatch import receiver
+
+from .deletion import deletion_finished, get_deletion_batch, is_being_deleted
+from .images import is_processed, schedule_image_processing
+from .models import (CustomUser, Favorite, Follow, Ingredient,
+                     IngredientRecipe, Recipe, ShoppingCart, Tag, TagRecipe)
+from .relations import (RELATION_KINDS, change_relation_counters,
+                        get_relation_target_id, relation_changed,
+                        relations_removed)
+from .search import invalidate_ingredients
+from .services import (RECIPES, TAGS, USERS, bump_generations,
+                       change_recipe_counts, invalidate_recipe_carts,
+                       touch_recipes)
+
+
+@receiver(pre_delete, sender=Recipe)
+@receiver(pre_delete, sender=CustomUser)
+def instance_deleting(sender, instance, **kwargs):
+    batch = get_deletion_batch()
+    if batch is not None:
+        batch.deleted[sender].add(instance.pk)
+
+
+@receiver(deletion_finished)
+def deletions_finished(sender, batch, **kwargs):
+    generations = []
+    for model, instances in list(batch.removed.items()):
+        if model in RELATION_KINDS:
+            generations += relations_removed(RELATION_KINDS[model],
+                                             instances, batch.deleted)
+    recipes = batch.removed[Recipe]
+    if recipes:
+        change_recipe_counts([
+            recipe.author_id for recipe in recipes
+            if recipe.author_id not in batch.deleted[CustomUser]
+        ], -1)
+        generations.append(RECIPES)
+    if batch.deleted[CustomUser]:
+        generations.append(USERS)
+    bump_generations(*generations)
+
+
+@receiver(post_save, sender=Favorite)
+@receiver(post_save, sender=ShoppingCart)
+@receiver(post_save, sender=Follow)
+def relation_saved(sender, instance, created, **kwargs):
+    kind = RELATION_KINDS[sender]
+    if created:
+        change_relation_counters(kind, [get_relation_target_id(instance)], 1)
+    relation_changed(kind, [instance.user_id])
+
+
+@receiver(post_delete, sender=Favorite)
+@receiver(post_delete, sender=ShoppingCart)
+@receiver(post_delete, sender=Follow)
+def relation_deleted(sender, instance, **kwargs):
+    batch = get_deletion_batch()
+    if batch is not None:
+        batch.removed[sender].append(instance)
+        return
+    bump_generations(*relations_removed(RELATION_KINDS[sender], [instance],
+                                        {}))
+
+
+@receiver(post_save, sender=IngredientRecipe)
+@receiver(post_delete, sender=IngredientRecipe)
+def ingredient_recipe_changed(sender, instance, **kwargs):
+    if is_being_deleted(Recipe, instance.recipe_id):
+        return
+    touch_recipes([instance.recipe_id])
+    invalidate_recipe_carts([instance.recipe_id])
+    bump_generations(RECIPES)
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_changed(sender, instance, **kwargs):
+    invalidate_recipe_carts([instance.id])
+    bump_generations(RECIPES)
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_created(sender, instance, created, **kwargs):
+    if created:
+        change_recipe_counts([instance.author_id])
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_deleted(sender, instance, **kwargs):
+    batch = get_deletion_batch()
+    if batch is not None:
+        batch.removed[sender].append(instance)
+        return
+    change_recipe_counts([instance.author_id], -1)
+    bump_generations(RECIPES)
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_image_saved(sender, instance, **kwargs):
+    if instance.image and not is_processed(instance.image.name):
+        schedule_image_processing(instance.id)
+
+
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def recipe_ingredients_changed(sender, instance, action, reverse, pk_set,
+                               **kwargs):
+    if not action.startswith('post_'):
+        return
+    recipe_ids = (pk_set or []) if reverse else [instance.id]
+    touch_recipes(recipe_ids)
+    invalidate_recipe_carts(recipe_ids)
+    bump_generations(RECIPES)
+
+
+@receiver(post_save, sender=TagRecipe)
+@receiver(post_delete, sender=TagRecipe)
+def tag_recipe_changed(sender, instance, **kwargs):
+    if is_being_deleted(Recipe, instance.recipe_id):
+        return
+    touch_recipes([instance.recipe_id])
+    bump_generations(RECIPES)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def recipe_tags_changed(sender, instance, action, reverse, pk_set,
+                        **kwargs):
+    if not action.startswith('post_'):
+        return
+    touch_recipes((pk_set or []) if reverse else [instance.id])
+    bump_generations(RECIPES)
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def tag_changed(sender, instance, **kwargs):
+    bump_generations(TAGS)
+
+
+@receiver(post_save, sender=CustomUser)
+def author_changed(sender, instance, update_fields=None, **kwargs):
+    if update_fields and set(update_fields) <= {'last_login'}:
+        return
+    bump_generations(RECIPES, USERS)
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def ingredient_changed(sender, instance, **kwargs):
+    invalidate_ingredients()
@@ -0,0 +1,77 @@
+import threading
+
+import webcolors
+
+from .models import Tag, TagRecipe
+from .services import TAGS, get_generation
+
+HEX_TO_NAME = dict(webcolors.CSS3_HEX_TO_NAMES)
+
+
+def hex_to_name(value):
+    return HEX_TO_NAME.get(webcolors.normalize_hex(value))
+
+
+class TagRegistryData:
+    def __init__(self, version, tags):
+        self.version = version
+        self.tags = list(tags)
+        self.by_id = {tag.id: tag for tag in self.tags}
+        self.by_slug = {tag.slug: tag for tag in self.tags}
+
+
+class TagRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._data = TagRegistryData(None, [])
+
+    def _get_data(self):
+        version = get_generation(TAGS)
+        data = self._data
+        if data.version != version:
+            with self._lock:
+                data = self._data
+                if data.version != version:
+                    data = self._data = TagRegistryData(
+                        version, Tag.objects.order_by('id')
+                    )
+        return data
+
+    def all(self):
+        return list(self._get_data().tags)
+
+    def get(self, tag_id):
+        return self._get_data().by_id.get(tag_id)
+
+    def get_many(self, tag_ids):
+        by_id = self._get_data().by_id
+        return sorted((by_id[tag_id] for tag_id in set(tag_ids)
+                       if tag_id in by_id), key=lambda tag: tag.id)
+
+    def get_by_slug(self, slug):
+        return self._get_data().by_slug.get(slug)
+
+    def slug_choices(self):
+        return [(slug, tag.name)
+                for slug, tag in self._get_data().by_slug.items()]
+
+    def ids_for_slugs(self, slugs):
+        by_slug = self._get_data().by_slug
+        return [by_slug[slug].id for slug in slugs if slug in by_slug]
+
+
+tag_registry = TagRegistry()
+
+
+def get_tag_choices():
+    return tag_registry.slug_choices()
+
+
+def get_recipe_tags(recipe):
+    if hasattr(recipe, 'tag_links'):
+        tag_ids = [link.tags_id for link in recipe.tag_links]
+    else:
+        tag_ids = TagRecipe.objects.filter(
+            recipe=recipe
+        ).values_list('tags_id', flat=True)
+    return tag_registry.get_many(tag_ids)
@@ -0,0 +1,75 @@
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from recipes.models import CustomUser, Favorite, Follow, Recipe, ShoppingCart
+from recipes.services import rebuild_counters
+
+FANS_COUNT = 10
+
+
+def get_counters():
+    return (
+        list(Recipe.objects.order_by('id').values_list(
+            'favorites_count', 'cart_count'
+        )),
+        list(CustomUser.objects.order_by('id').values_list(
+            'recipes_count', 'followers_count'
+        )),
+    )
+
+
+class CascadeDeleteTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = CustomUser.objects.create_user(
+            username='author', email='author@foodgram.ru', password='pass'
+        )
+        cls.popular, cls.quiet, cls.other = [
+            Recipe.objects.create(
+                author=cls.author, name=f'Рецепт {i}', text='Описание',
+                cooking_time=10, image='recipes/images/recipe.jpg'
+            )
+            for i in range(3)
+        ]
+        cls.fans = [
+            CustomUser.objects.create_user(
+                username=f'fan{i}', email=f'fan{i}@foodgram.ru',
+                password='pass'
+            )
+            for i in range(FANS_COUNT)
+        ]
+        for fan in cls.fans:
+            Favorite.objects.create(user=fan, recipe=cls.popular)
+            ShoppingCart.objects.create(user=fan, recipe=cls.popular)
+            Favorite.objects.create(user=fan, recipe=cls.other)
+            Follow.objects.create(user=fan, author=cls.author)
+        Favorite.objects.create(user=cls.fans[0], recipe=cls.quiet)
+        ShoppingCart.objects.create(user=cls.fans[0], recipe=cls.quiet)
+
+    def count_delete_queries(self, instance):
+        with CaptureQueriesContext(connection) as context:
+            instance.delete()
+        return len(context.captured_queries)
+
+    def assert_counters_consistent(self):
+        counters = get_counters()
+        rebuild_counters()
+        self.assertEqual(get_counters(), counters)
+
+    def test_recipe_delete_does_not_depend_on_relation_rows(self):
+        self.assertEqual(self.count_delete_queries(self.popular),
+                         self.count_delete_queries(self.quiet))
+        self.assert_counters_consistent()
+
+    def test_user_deletes_keep_counters(self):
+        self.fans[0].delete()
+        CustomUser.objects.filter(id__in=[fan.id for fan in self.fans[1:3]]
+                                  ).delete()
+        self.other.refresh_from_db()
+        self.author.refresh_from_db()
+        self.assertEqual(self.other.favorites_count, FANS_COUNT - 3)
+        self.assertEqual(self.author.followers_count, FANS_COUNT - 3)
+        self.assert_counters_consistent()
+        self.author.delete()
+        self.assert_counters_consistent()
@@ -0,0 +1,49 @@
+from unittest import skipUnless
+
+from django.db import connection
+from django.db.models import Exists, OuterRef
+from django.test import TestCase
+
+from recipes.models import (Favorite, Follow, Ingredient, Recipe, ShoppingCart,
+                            TagRecipe)
+
+SEQ_SCAN = 'Seq Scan on {}'
+
+
+def hot_queries():
+    return (
+        ('favorite by user and recipe',
+         Favorite.objects.filter(user_id=0, recipe_id=0)),
+        ('shopping cart by user and recipe',
+         ShoppingCart.objects.filter(user_id=0, recipe_id=0)),
+        ('follow by user and author',
+         Follow.objects.filter(user_id=0, author_id=0)),
+        ('recipe feed',
+         Recipe.objects.order_by('-pub_date', '-id')[:6]),
+        ('recipes of author',
+         Recipe.objects.filter(author_id=0).order_by('-pub_date')[:6]),
+        ('recipes by tag',
+         TagRecipe.objects.filter(tags_id=0).values('recipe_id')),
+        ('recipe feed by tags',
+         Recipe.objects.filter(Exists(TagRecipe.objects.filter(
+             recipe=OuterRef('pk'), tags_id__in=[0, 1]
+         ))).order_by('-pub_date', '-id')[:6]),
+        ('ingredient by name',
+         Ingredient.objects.filter(name='', measurement_unit='')),
+    )
+
+
+@skipUnless(connection.vendor == 'postgresql',
+            'Планы запросов проверяются только на PostgreSQL.')
+class HotQueryIndexesTest(TestCase):
+    def setUp(self):
+        with connection.cursor() as cursor:
+            cursor.execute('SET LOCAL enable_seqscan = off')
+
+    def test_hot_queries_use_indexes(self):
+        for title, queryset in hot_queries():
+            with self.subTest(query=title):
+                self.assertNotIn(
+                    SEQ_SCAN.format(queryset.model._meta.db_table),
+                    queryset.explain()
+                )
@@ -0,0 +1,160 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from unittest import skipIf
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+
+from recipes.models import CacheGeneration, CustomUser, Recipe
+from recipes.relations import (ADDED, ALREADY_ADDED, CART_RECIPES,
+                               FAVORITE_RECIPES, FOLLOWED_AUTHORS, NOT_ADDED,
+                               NOT_FOUND, RELATION_COUNTERS, RELATION_MODELS,
+                               RELATIONS_CACHE_KEY, REMOVED, add_relation,
+                               apply_relations, load_relation, remove_relation)
+from recipes.services import SCORES
+
+THREADS = 8
+ROUNDS = 5
+
+
+@skipIf(connection.vendor == 'sqlite',
+        'SQLite не поддерживает одновременную запись из нескольких потоков.')
+class ConcurrentRelationsTest(TransactionTestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            username='reader', email='reader@foodgram.ru', password='pass'
+        )
+        self.author = CustomUser.objects.create_user(
+            username='author', email='author@foodgram.ru', password='pass'
+        )
+        self.recipe = Recipe.objects.create(
+            author=self.author, name='Рецепт', text='Описание',
+            cooking_time=10, image='recipes/images/recipe.jpg'
+        )
+
+    def run_concurrently(self, executor, operation, *args):
+        barrier = threading.Barrier(THREADS)
+
+        def task():
+            try:
+                barrier.wait()
+                return operation(*args)
+            finally:
+                connection.close()
+
+        futures = [executor.submit(task) for _ in range(THREADS)]
+        return [future.result() for future in futures]
+
+    def assert_relation(self, kind, target_id, expected):
+        model, target = RELATION_MODELS[kind]
+        counter_model, field = RELATION_COUNTERS[kind]
+        self.assertEqual(model.objects.filter(
+            user=self.user, **{f'{target}_id': target_id}
+        ).count(), expected)
+        self.assertEqual(counter_model.objects.filter(
+            id=target_id
+        ).values_list(field, flat=True).get(), expected)
+
+    def test_toggles_apply_exactly_once(self):
+        targets = ((FAVORITE_RECIPES, self.recipe.id),
+                   (CART_RECIPES, self.recipe.id),
+                   (FOLLOWED_AUTHORS, self.author.id))
+        with ThreadPoolExecutor(max_workers=THREADS) as executor:
+            for kind, target_id in targets:
+                for _ in range(ROUNDS):
+                    for operation, expected in ((add_relation, 1),
+                                                (remove_relation, 0)):
+                        with self.subTest(kind=kind,
+                                          operation=operation.__name__):
+                            results = self.run_concurrently(
+                                executor, operation,
+                                kind, self.user.id, target_id
+                            )
+                            self.assertEqual(sum(results), 1)
+                            self.assert_relation(kind, target_id, expected)
+
+    def test_batches_apply_exactly_once(self):
+        with ThreadPoolExecutor(max_workers=THREADS) as executor:
+            for _ in range(ROUNDS):
+                for add_ids, remove_ids, status, expected in (
+                        ([self.recipe.id], [], ADDED, 1),
+                        ([], [self.recipe.id], REMOVED, 0)):
+                    results = self.run_concurrently(
+                        executor, apply_relations, FAVORITE_RECIPES,
+                        self.user.id, add_ids, remove_ids
+                    )
+                    self.assertEqual(
+                        [result[self.recipe.id] for result in results]
+                        .count(status), 1
+                    )
+                    self.assert_relation(FAVORITE_RECIPES, self.recipe.id,
+                                         expected)
+
+
+class ApplyRelationsTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(
+            username='reader', email='reader@foodgram.ru', password='pass'
+        )
+        author = CustomUser.objects.create_user(
+            username='author', email='author@foodgram.ru', password='pass'
+        )
+        cls.recipes = [
+            Recipe.objects.create(
+                author=author, name=f'Рецепт {i}', text='Описание',
+                cooking_time=10, image='recipes/images/recipe.jpg'
+            )
+            for i in range(4)
+        ]
+
+    def test_statuses_and_counters_follow_changed_rows(self):
+        first, second, third, fourth = (recipe.id for recipe in self.recipes)
+        add_relation(CART_RECIPES, self.user.id, first)
+        add_relation(CART_RECIPES, self.user.id, third)
+        results = apply_relations(CART_RECIPES, self.user.id,
+                                  [first, second, 0], [third, fourth])
+        self.assertEqual(results, {first: ALREADY_ADDED, second: ADDED,
+                                   0: NOT_FOUND, third: REMOVED,
+                                   fourth: NOT_ADDED})
+        self.assertEqual(
+            list(Recipe.objects.order_by('id').values_list('cart_count',
+                                                           flat=True)),
+            [1, 1, 0, 0]
+        )
+
+    def test_scores_generation_is_bumped_after_commit(self):
+        scores = CacheGeneration.objects.filter(name=SCORES)
+        before = list(scores.values_list('value', flat=True))
+        with self.captureOnCommitCallbacks(execute=True):
+            add_relation(FAVORITE_RECIPES, self.user.id, self.recipes[0].id)
+            self.assertEqual(list(scores.values_list('value', flat=True)),
+                             before)
+        self.assertNotEqual(list(scores.values_list('value', flat=True)),
+                            before)
+
+
+@override_settings(VIEWER_RELATIONS_CACHE_TIMEOUT=60)
+class ViewerRelationsCacheTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(
+            username='reader', email='reader@foodgram.ru', password='pass'
+        )
+        cls.recipe = Recipe.objects.create(
+            author=cls.user, name='Рецепт', text='Описание',
+            cooking_time=10, image='recipes/images/recipe.jpg'
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_stale_set_cached_before_commit_is_dropped(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            add_relation(FAVORITE_RECIPES, self.user.id, self.recipe.id)
+            cache.set(RELATIONS_CACHE_KEY.format(kind=FAVORITE_RECIPES,
+                                                 user_id=self.user.id),
+                      frozenset(), 60)
+        self.assertEqual(load_relation(FAVORITE_RECIPES, self.user.id),
+                         {self.recipe.id})
@@ -0,0 +1,33 @@
+from django.conf import settings
+from django.core.cache import caches
+from django.test import override_settings
+from rest_framework.test import APITestCase
+
+from recipes.models import Tag
+from recipes.tags import tag_registry
+
+TAGS_URL = '/api/tags/'
+
+
+@override_settings(GENERATION_CACHE_TIMEOUT=60)
+class TagRegistryTest(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.tag = Tag.objects.create(name='Завтрак', color='#E26C2D',
+                                     slug='breakfast')
+
+    def setUp(self):
+        for alias in settings.CACHES:
+            caches[alias].clear()
+
+    def test_tag_edit_refreshes_registry_and_list(self):
+        self.assertEqual(tag_registry.get(self.tag.id).name, 'Завтрак')
+        self.client.get(TAGS_URL)
+        self.tag.name = 'Обед'
+        self.tag.slug = 'lunch'
+        self.tag.save()
+        self.assertEqual(tag_registry.get(self.tag.id).name, 'Обед')
+        self.assertIsNone(tag_registry.get_by_slug('breakfast'))
+        self.assertEqual(tag_registry.ids_for_slugs(['lunch']), [self.tag.id])
+        response = self.client.get(TAGS_URL)
+        self.assertEqual([tag['slug'] for tag in response.data], ['lunch'])
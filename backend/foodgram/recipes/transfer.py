@@ -0,0 +1,276 @@
+import base64
+import binascii
+import json
+import mimetypes
+import uuid
+from itertools import islice
+
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
+from django.db import connection, transaction
+
+from .models import CustomUser, Ingredient, IngredientRecipe, Recipe, TagRecipe
+from .search import invalidate_ingredients
+from .services import RECIPES, bump_generations, change_recipe_counts
+from .tags import get_recipe_tags, tag_registry
+
+EXPORT_CHUNK_SIZE = 500
+IMPORT_BATCH_SIZE = 500
+MAX_REPORTED_ERRORS = 100
+DATA_URI = 'data:{};base64,{}'
+DATA_URI_PREFIX = 'data:'
+
+
+def encode_image(image):
+    if not image:
+        return None
+    mime = mimetypes.guess_type(image.name)[0] or 'application/octet-stream'
+    try:
+        with image.storage.open(image.name, 'rb') as file:
+            data = base64.b64encode(file.read()).decode()
+    except OSError:
+        return image.name
+    return DATA_URI.format(mime, data)
+
+
+def decode_image(value):
+    if not value.startswith(DATA_URI_PREFIX):
+        return value
+    try:
+        header, data = value.split(',', 1)
+        content = base64.b64decode(data, validate=True)
+    except (ValueError, binascii.Error):
+        raise ValidationError('Некорректное изображение.')
+    extension = header[len(DATA_URI_PREFIX):].split(';')[0].split('/')[-1]
+    return ContentFile(content, name=f'{uuid.uuid4()}.{extension}')
+
+
+def serialize_recipe(recipe, include_images=True):
+    return {
+        'author': recipe.author.username,
+        'name': recipe.name,
+        'text': recipe.text,
+        'cooking_time': recipe.cooking_time,
+        'image': (encode_image(recipe.image) if include_images
+                  else recipe.image.name),
+        'tags': [tag.slug for tag in get_recipe_tags(recipe)],
+        'ingredients': [
+            {
+                'name': link.ingredient.name,
+                'measurement_unit': link.ingredient.measurement_unit,
+                'amount': link.amount,
+            }
+            for link in recipe.ingredient_recipes.all()
+        ],
+    }
+
+
+def export_recipes(queryset=None, include_images=True,
+                   chunk_size=EXPORT_CHUNK_SIZE):
+    if queryset is None:
+        queryset = Recipe.objects.all()
+    queryset = queryset.with_related().order_by('id')
+    last_id = 0
+    while True:
+        chunk = list(queryset.filter(id__gt=last_id)[:chunk_size])
+        if not chunk:
+            return
+        for recipe in chunk:
+            yield json.dumps(serialize_recipe(recipe, include_images),
+                             ensure_ascii=False) + '\n'
+        last_id = chunk[-1].id
+
+
+def format_error(error):
+    if hasattr(error, 'error_dict'):
+        return '; '.join(f'{field}: {" ".join(messages)}'
+                         for field, messages in error.message_dict.items())
+    return '; '.join(error.messages)
+
+
+def iter_records(lines):
+    for number, line in enumerate(lines, 1):
+        if isinstance(line, bytes):
+            line = line.decode('utf-8')
+        line = line.strip()
+        if line:
+            yield number, line
+
+
+class RecipeImporter:
+    def __init__(self, author=None, batch_size=IMPORT_BATCH_SIZE):
+        self.author = author
+        self.batch_size = batch_size
+        self.created = 0
+        self.skipped = 0
+        self.failed = 0
+        self.errors = []
+
+    def run(self, lines):
+        records = iter_records(lines)
+        while True:
+            batch = list(islice(records, self.batch_size))
+            if not batch:
+                break
+            self.import_batch(batch)
+        return self
+
+    def add_error(self, number, message):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((number, message))
+
+    def parse(self, batch):
+        parsed = []
+        for number, line in batch:
+            try:
+                record = json.loads(line)
+                if not isinstance(record, dict):
+                    raise ValueError('Ожидается JSON-объект.')
+                if not isinstance(record.get('author', ''), (str, type(None))):
+                    raise ValueError('Автор должен быть строкой.')
+                if not all(isinstance(slug, str)
+                           for slug in record.get('tags', ())):
+                    raise ValueError('Теги должны быть строками.')
+                ingredients = {
+                    (item['name'].strip(), item['measurement_unit'].strip()):
+                        item.get('amount', 1)
+                    for item in record.get('ingredients', ())
+                }
+                if len(ingredients) != len(record.get('ingredients', ())):
+                    raise ValueError('Ингредиенты не могут повторяться.')
+            except (ValueError, KeyError, TypeError, AttributeError) as error:
+                self.add_error(number, str(error))
+                continue
+            parsed.append((number, record, ingredients))
+        return parsed
+
+    def get_authors(self, parsed):
+        usernames = {record['author'] for _, record, _ in parsed
+                     if record.get('author')}
+        return dict(CustomUser.objects.filter(
+            username__in=usernames
+        ).values_list('username', 'id'))
+
+    def get_existing(self, parsed, authors):
+        names = {record.get('name') for _, record, _ in parsed
+                 if isinstance(record.get('name'), str)}
+        author_ids = set(authors.values())
+        if self.author is not None:
+            author_ids.add(self.author.id)
+        return set(Recipe.objects.filter(
+            author_id__in=author_ids, name__in=names
+        ).values_list('author_id', 'name'))
+
+    def get_ingredients(self, parsed):
+        keys = set()
+        for _, _, ingredients in parsed:
+            keys.update(ingredients)
+        names = {name for name, _ in keys}
+        known = {
+            (name, unit): pk for pk, name, unit in Ingredient.objects.filter(
+                name__in=names
+            ).values_list('id', 'name', 'measurement_unit')
+        }
+        max_length = Ingredient._meta.get_field('name').max_length
+        missing = {
+            (name, unit) for name, unit in keys.difference(known)
+            if name and unit
+            and len(name) <= max_length and len(unit) <= max_length
+        }
+        if missing:
+            Ingredient.objects.bulk_create(
+                [Ingredient(name=name, measurement_unit=unit)
+                 for name, unit in missing],
+                ignore_conflicts=True
+            )
+            transaction.on_commit(invalidate_ingredients)
+            known.update(
+                ((name, unit), pk)
+                for pk, name, unit in Ingredient.objects.filter(
+                    name__in={name for name, _ in missing}
+                ).values_list('id', 'name', 'measurement_unit')
+            )
+        return known
+
+    def build(self, record, amounts, authors, ingredients, existing):
+        author_id = authors.get(record.get('author'))
+        if author_id is None:
+            if self.author is None:
+                raise ValidationError(
+                    f'Автор {record.get("author")} не найден.'
+                )
+            author_id = self.author.id
+        if (author_id, record.get('name')) in existing:
+            return None
+        tags = []
+        for slug in record.get('tags', ()):
+            tag = tag_registry.get_by_slug(slug)
+            if tag is None:
+                raise ValidationError(f'Тег {slug} не найден.')
+            tags.append(tag.id)
+        recipe = Recipe(
+            author_id=author_id,
+            name=record.get('name'),
+            text=record.get('text'),
+            cooking_time=record.get('cooking_time'),
+        )
+        recipe.full_clean(exclude=('author', 'image'), validate_unique=False)
+        if not record.get('image'):
+            raise ValidationError('Не указано изображение.')
+        recipe.image = decode_image(record['image'])
+        amount_field = IngredientRecipe._meta.get_field('amount')
+        links = {}
+        for key, amount in amounts.items():
+            if key not in ingredients:
+                raise ValidationError(f'Некорректный ингредиент {key[0]}.')
+            links[ingredients[key]] = amount_field.clean(amount, None)
+        return recipe, set(tags), links
+
+    def import_batch(self, batch):
+        parsed = self.parse(batch)
+        if not parsed:
+            return
+        with transaction.atomic():
+            authors = self.get_authors(parsed)
+            existing = self.get_existing(parsed, authors)
+            ingredients = self.get_ingredients(parsed)
+            built = []
+            for number, record, amounts in parsed:
+                try:
+                    item = self.build(record, amounts, authors, ingredients,
+                                      existing)
+                except ValidationError as error:
+                    self.add_error(number, format_error(error))
+                    continue
+                if item is None:
+                    self.skipped += 1
+                    continue
+                recipe = item[0]
+                existing.add((recipe.author_id, recipe.name))
+                built.append(item)
+            self.save(built)
+
+    def save(self, built):
+        recipes = [recipe for recipe, _, _ in built]
+        if connection.features.can_return_rows_from_bulk_insert:
+            Recipe.objects.bulk_create(recipes, batch_size=self.batch_size)
+            change_recipe_counts([recipe.author_id for recipe in recipes])
+        else:
+            for recipe in recipes:
+                recipe.save()
+        TagRecipe.objects.bulk_create(
+            [TagRecipe(recipe=recipe, tags_id=tag_id)
+             for recipe, tags, _ in built for tag_id in tags],
+            batch_size=self.batch_size
+        )
+        IngredientRecipe.objects.bulk_create(
+            [IngredientRecipe(recipe=recipe, ingredient_id=ingredient_id,
+                              amount=amount)
+             for recipe, _, links in built
+             for ingredient_id, amount in links.items()],
+            batch_size=self.batch_size
+        )
+        self.created += len(recipes)
+        if recipes:
+            transaction.on_commit(lambda: bump_generations(RECIPES))
@@ -0,0 +1,61 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+
+from .models import Recipe, RecipeActivity
+from .services import SCORES, bump_generations
+
+UPSERT_ACTIVITY_SQL = (
+    'INSERT INTO {table} ({recipe}, {day}, {score}) VALUES {values} '
+    'ON CONFLICT ({recipe}, {day}) DO UPDATE '
+    'SET {score} = {table}.{score} + EXCLUDED.{score}'
+)
+
+
+def get_trending_cutoff():
+    return timezone.localdate() - timedelta(
+        days=settings.RECIPE_TRENDING_DAYS - 1
+    )
+
+
+def record_activity(recipe_ids, delta):
+    recipe_ids = sorted(set(recipe_ids))
+    if not recipe_ids:
+        return
+    opts = RecipeActivity._meta
+    quote_name = connection.ops.quote_name
+    sql = UPSERT_ACTIVITY_SQL.format(
+        table=quote_name(opts.db_table),
+        recipe=quote_name(opts.get_field('recipe').column),
+        day=quote_name(opts.get_field('day').column),
+        score=quote_name(opts.get_field('score').column),
+        values=', '.join(['(%s, %s, %s)'] * len(recipe_ids))
+    )
+    today = connection.ops.adapt_datefield_value(timezone.localdate())
+    params = []
+    for recipe_id in recipe_ids:
+        params += [recipe_id, today, delta]
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+
+
+def refresh_trending(full=False):
+    cutoff = get_trending_cutoff()
+    expired = RecipeActivity.objects.filter(day__lt=cutoff)
+    recipes = Recipe.objects.all()
+    if not full:
+        recipes = recipes.filter(id__in=expired.values('recipe_id'))
+    window = RecipeActivity.objects.filter(
+        recipe=OuterRef('pk'), day__gte=cutoff
+    ).order_by().values('recipe').annotate(total=Sum('score')).values('total')
+    with transaction.atomic():
+        updated = recipes.update(
+            trending_score=Greatest(Coalesce(Subquery(window), 0), 0)
+        )
+        removed, _ = expired.delete()
+        bump_generations(SCORES)
+    return updated, removed